@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.urls import register_converter
 
 
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'base'
+
+    def ready(self):
+        from .converters import SmallIntConverter
+        register_converter(SmallIntConverter, 'spk')
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from base.models import StockBatch
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete soft-deleted stock batches to keep the hot table small. "
+        "StockBatch has no deleted-at column, so date_received is used as a "
+        "conservative cutoff: a batch is only purged once it was received more "
+        "than --days ago AND is already soft-deleted. Movement and order line "
+        "references are SET_NULL, so history rows survive without the batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Only purge batches received more than this many days ago (default 30)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many batches would be purged without deleting",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = now().date() - timedelta(days=options["days"])
+        # all_objects bypasses the soft-delete manager so the flagged rows
+        # are actually visible here
+        queryset = StockBatch.all_objects.filter(
+            is_deleted=True,
+            date_received__lt=cutoff,
+        )
+
+        if options["dry_run"]:
+            count = queryset.count()
+            self.stdout.write(
+                self.style.WARNING(f"Dry run: {count} soft-deleted batch(es) would be purged.")
+            )
+            return
+
+        # QuerySet.delete() is a real DELETE — only instance delete() is
+        # overridden to soft-delete on SoftDeleteModel
+        deleted, _ = queryset.delete()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} soft-deleted batch(es)."))
@@ -0,0 +1,44 @@
+"""Run the root verification scripts under one django.setup().
+
+Each of verify_discount_mapping.py, verify_refund_flow.py,
+verify_sale_payment_flow.py and test_multi_item_dispense.py pays the full
+Django bootstrap when invoked standalone. This command dispatches to their
+main functions so a CI run of all four boots Django once.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Run one or all of the root verification scripts (discount, refund, sale, dispense)."
+
+    TARGETS = ['discount', 'refund', 'sale', 'dispense']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            default='all',
+            choices=self.TARGETS + ['all'],
+            help="Which verification to run (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        # Imported lazily: the scripts live at the project root and call
+        # django.setup() at import time, which is a no-op here since the
+        # management framework has already set the registry up.
+        import test_multi_item_dispense
+        import verify_discount_mapping
+        import verify_refund_flow
+        import verify_sale_payment_flow
+
+        runners = {
+            'discount': verify_discount_mapping.main,
+            'refund': verify_refund_flow.main,
+            'sale': verify_sale_payment_flow.main,
+            'dispense': test_multi_item_dispense.test_multi_item_dispense,
+        }
+
+        target = options['target']
+        targets = self.TARGETS if target == 'all' else [target]
+        for name in targets:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"--- {name} ---"))
+            runners[name]()
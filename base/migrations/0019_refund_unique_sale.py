@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_add_loose_pieces_to_stockbatch'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='refund',
+            constraint=models.UniqueConstraint(fields=('sale',), name='uniq_refund_per_sale'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0020_activitylog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='notif_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refund',
+            index=models.Index(fields=['status', 'refund_date'], name='refund_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockbatch',
+            index=models.Index(fields=['is_deleted', 'expiry_date', 'quantity'], name='batch_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sale_date'], name='sale_date_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0021_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockbatch',
+            index=models.Index(fields=['medicine', 'is_deleted', 'is_recalled', 'location'], name='batch_front_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderline',
+            index=models.Index(fields=['purchase_order', 'quantity_received'], name='poline_po_recv_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0023_stockmovement_date_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stockbatch',
+            name='batch_front_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stockbatch',
+            index=models.Index(
+                fields=['medicine', 'is_deleted', 'is_recalled', 'location', 'date_received'],
+                name='batch_promote_idx',
+            ),
+        ),
+    ]
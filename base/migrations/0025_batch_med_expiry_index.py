@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0024_batch_promote_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockbatch',
+            index=models.Index(
+                fields=['medicine', 'is_deleted', 'is_recalled', 'expiry_date'],
+                name='batch_med_expiry_idx',
+            ),
+        ),
+    ]
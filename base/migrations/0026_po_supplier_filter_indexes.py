@@ -0,0 +1,24 @@
+# Written manually as RunSQL: Supplier and the current PurchaseOrder shape
+# were never recorded in migration state (0016 created an earlier
+# PurchaseOrder model), so AddIndex operations cannot resolve here. The raw
+# CREATE INDEX statements match the Meta.indexes declared on the models.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0025_batch_med_expiry_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX supp_isdel_status_idx ON base_supplier (is_deleted, status)",
+            reverse_sql="DROP INDEX supp_isdel_status_idx ON base_supplier",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX po_isdel_created_idx ON base_purchaseorder (is_deleted, created_at DESC)",
+            reverse_sql="DROP INDEX po_isdel_created_idx ON base_purchaseorder",
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0026_po_supplier_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(
+                fields=['sale', 'medicine'],
+                name='movement_sale_med_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(
+                fields=['sale', 'batch'],
+                name='movement_sale_batch_idx',
+            ),
+        ),
+    ]
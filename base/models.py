@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from django.utils.timezone import now
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete
 from django.apps import apps
 from decimal import Decimal
 # --------------------------- SOFT DELETE BASE MODEL ---------------------------
@@ -53,6 +53,14 @@ class ActivityLog(models.Model):
     action = models.CharField(max_length=255)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # The log page always orders by newest-first, optionally
+            # narrowed to one user.
+            models.Index(fields=['-timestamp'], name='activitylog_ts_desc_idx'),
+            models.Index(fields=['user', 'timestamp'], name='activitylog_user_ts_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.action} at {self.timestamp}" 
 
@@ -76,6 +84,10 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread-badge count and per-user notification list
+            models.Index(fields=['user', 'is_read'], name='notif_user_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} - {self.title}"
@@ -347,6 +359,16 @@ class Refund(models.Model):
         ordering = ['-refund_date']
         verbose_name = "Refund"
         verbose_name_plural = "Refunds"
+        indexes = [
+            # Status counters on the refund list plus its date ordering
+            models.Index(fields=['status', 'refund_date'], name='refund_status_date_idx'),
+        ]
+        constraints = [
+            # Full-sale refunds only: the DB rejects a second refund for the
+            # same sale, so views can rely on IntegrityError instead of a racy
+            # exists() pre-check.
+            models.UniqueConstraint(fields=['sale'], name='uniq_refund_per_sale'),
+        ]
 
     def __str__(self):
         return f"Refund #{self.refund_id} - Sale #{self.sale.sale_id} (₱{self.amount_refunded})"
@@ -552,6 +574,25 @@ class StockBatch(SoftDeleteModel):
 
     class Meta:
         ordering = ["date_received"]
+        indexes = [
+            # Expiry sweep in generate_notifications / expiration monitor
+            models.Index(fields=['is_deleted', 'expiry_date', 'quantity'], name='batch_expiry_idx'),
+            # Front-shelf probes when receiving/creating batches, plus the
+            # auto-promotion "oldest back batch" ORDER BY date_received
+            # LIMIT 1. Plain composite (not partial): MySQL has no partial
+            # indexes.
+            models.Index(
+                fields=['medicine', 'is_deleted', 'is_recalled', 'location', 'date_received'],
+                name='batch_promote_idx',
+            ),
+            # Per-medicine availability sums filter live batches by expiry
+            # (dispense page, order availability checks). The promote index
+            # above already serves the FIFO date_received ordering.
+            models.Index(
+                fields=['medicine', 'is_deleted', 'is_recalled', 'expiry_date'],
+                name='batch_med_expiry_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if self.date_received and not self.expiry_date:
@@ -611,6 +652,7 @@ class StockBatch(SoftDeleteModel):
         ).order_by("loc_order", "date_received")
 
         total_dispensed = 0
+        movement_ids = []
 
         for batch in batches:
             if pieces_needed <= 0:
@@ -622,7 +664,7 @@ class StockBatch(SoftDeleteModel):
                 consumed = batch_total_pieces
                 total_dispensed += consumed
                 pieces_needed -= consumed
-                StockMovement.objects.create(
+                movement = StockMovement.objects.create(
                     medicine=batch.medicine,
                     batch=batch,
                     from_location=batch.location,
@@ -632,6 +674,7 @@ class StockBatch(SoftDeleteModel):
                     remarks="Dispensed (full batch) via FIFO",
                     user=user
                 )
+                movement_ids.append(movement.pk)
                 batch.delete()
             else:
                 consumed = pieces_needed
@@ -640,7 +683,7 @@ class StockBatch(SoftDeleteModel):
                 batch.quantity = remaining_pieces // pieces_per_box
                 batch.loose_pieces = remaining_pieces % pieces_per_box
                 batch.save()
-                StockMovement.objects.create(
+                movement = StockMovement.objects.create(
                     medicine=batch.medicine,
                     batch=batch,
                     from_location=batch.location,
@@ -650,6 +693,7 @@ class StockBatch(SoftDeleteModel):
                     remarks="Dispensed (partial batch) via FIFO",
                     user=user
                 )
+                movement_ids.append(movement.pk)
                 total_dispensed += consumed
                 pieces_needed = 0
 
@@ -680,7 +724,9 @@ class StockBatch(SoftDeleteModel):
         except Exception:
             pass
 
-        return pieces_needed
+        # Return the sale movement pks too so callers can link them to a
+        # sale/line item directly instead of re-querying by time window.
+        return pieces_needed, movement_ids
 
     def is_expired(self):
         total = self.total_pieces
@@ -728,6 +774,13 @@ class StockMovement(models.Model):
 
     class Meta:
         ordering = ["-movement_date"]
+        indexes = [
+            # Serves the movement list's ORDER BY -movement_date
+            models.Index(fields=['-movement_date'], name='movement_date_desc_idx'),
+            # Refund flows walk a sale's movements joining medicine/batch
+            models.Index(fields=['sale', 'medicine'], name='movement_sale_med_idx'),
+            models.Index(fields=['sale', 'batch'], name='movement_sale_batch_idx'),
+        ]
 
     def __str__(self):
         return f"{self.medicine.name} - {self.reason} ({self.quantity} pcs)"
@@ -774,6 +827,12 @@ class Sale(models.Model):
     change_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Change returned to customer")
     invoice_number = models.CharField(max_length=30, blank=True, null=True, help_text="Printable invoice number")
 
+    class Meta:
+        indexes = [
+            # 30-day sales windows on the dashboard and reports
+            models.Index(fields=['sale_date'], name='sale_date_idx'),
+        ]
+
     def __str__(self):
         return f"Sale #{self.sale_id} - {self.sale_date.strftime('%Y-%m-%d %H:%M')}"
 
@@ -791,7 +850,7 @@ class Sale(models.Model):
         self.final_amount = subtotal - self.discount_amount
         self.save(update_fields=['total_amount', 'discount_rate', 'discount_amount', 'final_amount'])
 
-    def finalize_payment(self, cash_received):
+    def finalize_payment(self, cash_received, status=None):
         from decimal import Decimal
         if self.final_amount == 0:
             self.apply_discount()
@@ -800,7 +859,13 @@ class Sale(models.Model):
         self.change_amount = cash - self.final_amount if cash >= self.final_amount else Decimal('0.00')
         if not self.invoice_number:
             self.invoice_number = f"INV-{self.sale_id:06d}"
-        self.save(update_fields=['cash_received', 'change_amount', 'invoice_number'])
+        update_fields = ['cash_received', 'change_amount', 'invoice_number']
+        # Callers used to follow this with a second status-only save; folding
+        # the status change in here keeps it to one UPDATE
+        if status is not None:
+            self.status = status
+            update_fields.append('status')
+        self.save(update_fields=update_fields)
 
     def effective_discount_label(self):
         return self.discount_type_fk.discount_name if self.discount_type_fk else 'No Discount'
@@ -1187,6 +1252,43 @@ def create_default_discount_types(sender, **kwargs):
         )
 post_migrate.connect(create_default_discount_types)
 
+def _clear_dispense_option_cache(sender, **kwargs):
+    """Drop the cached active discount/payment lists when either table changes."""
+    from django.core.cache import cache
+    cache.delete_many(['active_discount_types', 'active_payment_methods'])
+
+def _clear_dispense_medicines_cache(sender, **kwargs):
+    """Drop the cached dispense-page medicines payload when stock changes.
+
+    Also drops the transfer-page ETag version so quantity edits that
+    create no movement row (e.g. batch_update_modal) still invalidate
+    conditional GETs of the transfer page."""
+    from django.core.cache import cache
+    cache.delete_many(['dispense:medicines_json', 'med_filter_choices', 'transfer_stock_ver'])
+
+post_save.connect(_clear_dispense_medicines_cache, sender=Medicine)
+post_delete.connect(_clear_dispense_medicines_cache, sender=Medicine)
+post_save.connect(_clear_dispense_medicines_cache, sender=StockBatch)
+post_delete.connect(_clear_dispense_medicines_cache, sender=StockBatch)
+
+def _clear_default_supplier_cache(sender, **kwargs):
+    """Re-resolve the default PO supplier after supplier changes."""
+    from django.core.cache import cache
+    cache.delete('default_supplier_id')
+
+def _clear_pricehistory_count_cache(sender, **kwargs):
+    """Keep the cached unfiltered paginator total exact."""
+    from django.core.cache import cache
+    cache.delete('pricehistory_total_count')
+
+post_save.connect(_clear_pricehistory_count_cache, sender=PriceHistory)
+post_delete.connect(_clear_pricehistory_count_cache, sender=PriceHistory)
+
+post_save.connect(_clear_dispense_option_cache, sender=DiscountType)
+post_delete.connect(_clear_dispense_option_cache, sender=DiscountType)
+post_save.connect(_clear_dispense_option_cache, sender=PaymentMethod)
+post_delete.connect(_clear_dispense_option_cache, sender=PaymentMethod)
+
 # Post-migrate signal to create default payment methods
 def create_default_payment_methods(sender, **kwargs):
     """Create default payment methods on first migrate"""
@@ -1364,7 +1466,12 @@ class Supplier(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Active')
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self): return self.name
-    class Meta: ordering = ['name']
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            # Default-supplier lookup (is_deleted=False, status='Active')
+            models.Index(fields=['is_deleted', 'status'], name='supp_isdel_status_idx'),
+        ]
 
 class PurchaseOrder(models.Model):
     """Purchase orders for ordering stock from suppliers."""
@@ -1378,7 +1485,12 @@ class PurchaseOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_purchase_orders')
-    class Meta: ordering = ['-created_at']
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # List/modal views: filter is_deleted=False, order by -created_at
+            models.Index(fields=['is_deleted', '-created_at'], name='po_isdel_created_idx'),
+        ]
     def __str__(self): return f"PO #{self.id} - {self.supplier.name} ({self.status})"
     def total_cost(self): return sum(line.line_total() for line in self.lines.all())
 
@@ -1393,6 +1505,17 @@ class PurchaseOrderLine(models.Model):
     manufactured_date = models.DateField(blank=True, null=True, help_text="Manufacturing date of the medicine")
     expiration_date = models.DateField(blank=True, null=True, help_text="Expiration date of the medicine")
     remarks = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Unreceived-lines Exists probe on the batch receive page
+            models.Index(fields=['purchase_order', 'quantity_received'], name='poline_po_recv_idx'),
+        ]
+
     def line_total(self): return self.quantity_ordered * self.unit_cost
     def is_fully_received(self): return self.quantity_received >= self.quantity_ordered
     def __str__(self): return f"{self.medicine.name} - {self.quantity_ordered} {self.unit}"
+
+
+post_save.connect(_clear_default_supplier_cache, sender=Supplier)
+post_delete.connect(_clear_default_supplier_cache, sender=Supplier)
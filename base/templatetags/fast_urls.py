@@ -0,0 +1,19 @@
+from django import template
+from django.urls import reverse
+
+register = template.Library()
+
+# Maps url name -> reversed path with a placeholder pk of 0, e.g. '/refunds/0/approve/'.
+# Reversing once and substituting the pk per row is much cheaper than running the
+# full resolver machinery for every {% url %} in a list table.
+_TEMPLATE_CACHE: dict[str, str] = {}
+
+
+@register.simple_tag
+def fast_url(name, pk):
+    """Like {% url name pk %} for single-pk routes, but caches the reverse."""
+    tpl = _TEMPLATE_CACHE.get(name)
+    if tpl is None:
+        tpl = reverse(name, args=[0])
+        _TEMPLATE_CACHE[name] = tpl
+    return tpl.replace('/0/', f'/{pk}/', 1)
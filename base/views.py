@@ -2,11 +2,26 @@ from django import forms
 from django.utils import timezone
 from base.models import Sale, PaymentMethod, Refund, StockMovement, Ordering, OrderedProduct, SaleLineItem
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy
 from django.views.generic import FormView, ListView, DetailView, View, CreateView
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
-from django.db.models import Q
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, Exists, F, Max, OuterRef, Prefetch, Q, Subquery, Sum, When
+from django.db.models.functions import Greatest
+
+def is_xhr(request):
+    """True when the request arrived via XMLHttpRequest.
+
+    Memoized on the request so views that branch on it several times do a
+    single header lookup.
+    """
+    cached = getattr(request, '_is_xhr', None)
+    if cached is None:
+        cached = request.headers.get('x-requested-with', '').lower() == 'xmlhttprequest'
+        request._is_xhr = cached
+    return cached
 
 class RefundCreateForm(forms.Form):
     # Only allow sales that have no existing refunds
@@ -53,11 +68,8 @@ class RefundCreateView(LoginRequiredMixin, FormView):
         return ctx
 
     def form_valid(self, form):
+
         sale = form.cleaned_data['sale']
-        # Guard against race condition or stale queryset allowing duplicate refund
-        if Refund.objects.filter(sale=sale).exists():
-            form.add_error('sale', 'This sale already has a refund.')
-            return self.form_invalid(form)
         reason = form.cleaned_data['reason']
         reason_details = form.cleaned_data.get('reason_details')
         payment_method = form.cleaned_data.get('payment_method') or sale.payment_method
@@ -68,46 +80,68 @@ class RefundCreateView(LoginRequiredMixin, FormView):
             form.add_error(None, 'Sale has zero amount; cannot refund.')
             return self.form_invalid(form)
 
-        # Inventory reversal: add quantities back to original batches
-        movements = sale.movements.select_related('batch', 'medicine').all()
-        restored_total = 0
-        for m in movements:
-            if m.batch and m.quantity > 0:
-                m.batch.quantity += m.quantity
-                m.batch.save()
-                restored_total += m.quantity
-                # Log stock movement reversal
-                StockMovement.objects.create(
-                    medicine=m.medicine,
-                    batch=m.batch,
-                    from_location='',
-                    to_location=m.batch.location,
-                    quantity=m.quantity,
-                    reason='returned',
-                    remarks=f'Refund reversal of Sale #{sale.sale_id}',
-                    user=self.request.user
-                )
-
-        # All new refunds start as Pending; require explicit approval
-        status = 'Pending'
-        refund = Refund.objects.create(
-            sale=sale,
-            amount_refunded=amount,
-            reason=reason,
-            reason_details=reason_details,
-            processed_by=self.request.user,
-            payment_method=payment_method,
-            reference_number=reference_number,
-            status=status,
-            approved_by=None,
-            approved_date=None
-        )
+        with transaction.atomic():
+            # Create the refund first: the unique constraint on sale makes the
+            # DB reject duplicates, replacing the old racy exists() pre-check,
+            # and a duplicate bails out before any inventory is touched.
+            try:
+                with transaction.atomic():
+                    refund = Refund.objects.create(
+                        sale=sale,
+                        amount_refunded=amount,
+                        reason=reason,
+                        reason_details=reason_details,
+                        processed_by=self.request.user,
+                        payment_method=payment_method,
+                        reference_number=reference_number,
+                        # All new refunds start as Pending; require explicit approval
+                        status='Pending',
+                        approved_by=None,
+                        approved_date=None
+                    )
+            except IntegrityError:
+                form.add_error('sale', 'This sale already has a refund.')
+                return self.form_invalid(form)
+
+            # Inventory reversal: add quantities back to original batches.
+            # One locked UPDATE for all batches plus one bulk INSERT for the
+            # reversal movements, instead of two writes per movement.
+            movements = list(sale.movements.select_related('batch', 'medicine'))
+            batch_deltas = {}
+            for m in movements:
+                if m.batch_id and m.quantity > 0:
+                    batch_deltas[m.batch_id] = batch_deltas.get(m.batch_id, 0) + m.quantity
+
+            restored_total = 0
+            if batch_deltas:
+                locked = StockBatch.all_objects.filter(pk__in=batch_deltas).select_for_update()
+                len(locked)  # acquire row locks before computing the update
+                locked.update(quantity=Case(
+                    *[When(pk=pk, then=F('quantity') + delta) for pk, delta in batch_deltas.items()]
+                ))
+
+            reversal_movements = []
+            for m in movements:
+                if m.batch_id and m.quantity > 0:
+                    restored_total += m.quantity
+                    reversal_movements.append(StockMovement(
+                        medicine=m.medicine,
+                        batch=m.batch,
+                        from_location='',
+                        to_location=m.batch.location,
+                        quantity=m.quantity,
+                        reason='returned',
+                        remarks=f'Refund reversal of Sale #{sale.sale_id}',
+                        user=self.request.user
+                    ))
+            if reversal_movements:
+                StockMovement.objects.bulk_create(reversal_movements, batch_size=500)
 
         log_activity(self.request.user, f"Processed refund #{refund.refund_id} for Sale #{sale.sale_id} amount ₱{amount}")
         messages.success(self.request, f"Refund submitted and marked Pending. Restored {restored_total} units to inventory.")
 
         # AJAX response
-        if self.request.headers.get('x-requested-with') == 'XMLHttpRequest' or self.request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
+        if is_xhr(self.request):
             return JsonResponse({
                 'success': True,
                 'refund_id': refund.refund_id,
@@ -117,7 +151,7 @@ class RefundCreateView(LoginRequiredMixin, FormView):
         return super().form_valid(form)
 
     def form_invalid(self, form):
-        if self.request.headers.get('x-requested-with') == 'XMLHttpRequest' or self.request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
+        if is_xhr(self.request):
             return JsonResponse({'success': False, 'errors': form.errors}, status=400)
         return super().form_invalid(form)
 
@@ -125,17 +159,31 @@ class RefundListView(LoginRequiredMixin, ListView):
     model = Refund
     template_name = 'sales/refund_list.html'
     context_object_name = 'refunds'
-    ordering = ['-refund_date']
+
+    def get_queryset(self):
+        # Join everything the list template touches so rendering a page of
+        # refunds stays at one query instead of several per row
+        return Refund.objects.select_related(
+            'sale', 'sale__payment_method', 'processed_by', 'approved_by', 'payment_method'
+        ).order_by('-refund_date')
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx['total_refunds'] = self.get_queryset().count()
-        ctx['pending_count'] = self.get_queryset().filter(status='Pending').count()
-        ctx['approved_count'] = self.get_queryset().filter(status='Approved').count()
-        # Add recent sales and payment methods for the modal
-        ctx['recent_sales'] = Sale.objects.order_by('-sale_id')[:50]
+        counts = Refund.objects.aggregate(
+            total=Count('pk'),
+            pending=Count('pk', filter=Q(status='Pending')),
+            approved=Count('pk', filter=Q(status='Approved')),
+        )
+        ctx['total_refunds'] = counts['total']
+        ctx['pending_count'] = counts['pending']
+        ctx['approved_count'] = counts['approved']
+        # Payment methods for the modal; the sale select renders empty and
+        # the modal JS fills it from recent_sales_json when first opened,
+        # so the page load never pays for the sale rows.
         ctx['payment_methods'] = PaymentMethod.objects.filter(is_active=True)
-        ctx['refund_form'] = RefundCreateForm()
+        refund_form = RefundCreateForm()
+        refund_form.fields['sale'].choices = [('', '---------')]
+        ctx['refund_form'] = refund_form
         ctx['is_manager_or_admin'] = is_manager_or_admin(self.request.user)
         ctx['user_role'] = get_user_role_display(self.request.user)
         return ctx
@@ -163,22 +211,41 @@ def refund_detail_modal(request, pk):
 
 class RefundApproveView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        refund = get_object_or_404(Refund, pk=pk, status='Pending')
         if not is_manager_or_admin(request.user):
             # AJAX or standard form: return JSON if XHR
-            if request.headers.get('x-requested-with') == 'XMLHttpRequest' or request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
+            if is_xhr(request):
                 return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
             messages.error(request, 'Not authorized to approve refunds.')
-            return redirect('refund-detail', pk=refund.pk)
-        refund.status = 'Approved'
-        refund.approved_by = request.user
-        refund.approved_date = timezone.now()
-        refund.save(update_fields=['status', 'approved_by', 'approved_date'])
-        log_activity(request.user, f"Approved refund #{refund.refund_id}")
-        messages.success(request, f"Refund #{refund.refund_id} approved.")
-        if request.headers.get('x-requested-with') == 'XMLHttpRequest' or request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
-            return JsonResponse({'success': True, 'refund_id': refund.refund_id, 'status': 'Approved'})
-        return redirect('refund-detail', pk=refund.pk)
+            return redirect('refund-detail', pk=pk)
+        # Conditional UPDATE instead of fetch-then-save: approves only while
+        # still pending, so a double-submit can't approve twice.
+        updated = Refund.objects.filter(pk=pk, status='Pending').update(
+            status='Approved',
+            approved_by=request.user,
+            approved_date=timezone.now(),
+        )
+        if updated == 0:
+            # Missing or already processed — same 404 as before.
+            get_object_or_404(Refund, pk=pk, status='Pending')
+        log_activity(request.user, f"Approved refund #{pk}")
+        messages.success(request, f"Refund #{pk} approved.")
+        if is_xhr(request):
+            return JsonResponse({'success': True, 'refund_id': pk, 'status': 'Approved'})
+        return redirect('refund-detail', pk=pk)
+
+@login_required
+def recent_sales_json(request):
+    """Return the latest unrefunded sales for the refund modal.
+
+    Fetched by the modal when it opens, so the refund list page itself
+    never pays for these rows.
+    """
+    sales = list(
+        Sale.objects.filter(refunds__isnull=True)
+        .order_by('-sale_id')
+        .values('sale_id', 'sale_date', 'customer_name', 'final_amount')[:50]
+    )
+    return JsonResponse({'sales': sales})
 from django import forms
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
@@ -191,12 +258,21 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView, PasswordChangeView
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from base.models import Task, ActivityLog, Medicine, StockBatch, StockMovement, Sale, Employee, Role, DiscountType, PaymentMethod, Refund, Ordering, OrderedProduct, SaleLineItem, Notification
+from django.http import Http404, JsonResponse, HttpResponseForbidden
+from django.views.decorators.http import etag, last_modified
+from django.utils.decorators import method_decorator
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from base.models import Task, ActivityLog, Medicine, StockBatch, StockMovement, Sale, Employee, Role, DiscountType, PaymentMethod, Refund, Ordering, OrderedProduct, SaleLineItem, Notification, PriceHistory, PurchaseOrder, PurchaseOrderLine, Supplier
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+import json
+from functools import wraps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.utils.timezone import now
@@ -209,129 +285,183 @@ def is_manager_or_admin(user):
     """
     Check if user is a manager or admin using the new Role system.
     Falls back to Django's is_superuser/groups if Employee profile doesn't exist.
+
+    The result is memoized on the user object: most views call this (and
+    get_user_role_display) several times per request, and each uncached call
+    costs an Employee plus a designation/role query.
     """
+    cached = getattr(user, '_is_manager_cached', None)
+    if cached is not None:
+        return cached
+
     if user.is_superuser:
-        return True
-    
-    # Check new Role system via Employee
-    try:
-        employee = user.employee_profile
-        return employee.has_role('Manager')
-    except Employee.DoesNotExist:
-        # Fallback to old Django Groups system during migration
-        return user.groups.filter(name='Manager').exists()
+        result = True
+    else:
+        # Check new Role system via Employee
+        try:
+            employee = user.employee_profile
+            result = employee.has_role('Manager')
+        except Employee.DoesNotExist:
+            # Fallback to old Django Groups system during migration
+            result = user.groups.filter(name='Manager').exists()
+
+    user._is_manager_cached = result
+    return result
 
 def get_user_role_display(user):
-    """Get user's primary role name for display"""
+    """Get user's primary role name for display (memoized per user object)"""
+    cached = getattr(user, '_role_display_cached', None)
+    if cached is not None:
+        return cached
+
     try:
         employee = user.employee_profile
         primary_role = employee.get_primary_role()
-        return primary_role.role_name if primary_role else 'Staff'
+        result = primary_role.role_name if primary_role else 'Staff'
     except Employee.DoesNotExist:
-        if user.is_superuser:
-            return 'Manager'
-        return 'Staff'
+        result = 'Manager' if user.is_superuser else 'Staff'
+
+    user._role_display_cached = result
+    return result
 
 # --------------------------- NOTIFICATION HELPERS ---------------------------
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def generate_notifications_async():
+    """Run generate_notifications on a background thread.
+
+    The scan can take a while on a loaded catalog; the dashboard should not
+    wait on it. Failures are logged instead of silently swallowed, and the
+    thread closes its own DB connection when done.
+    """
+    def _run():
+        try:
+            generate_notifications()
+        except Exception:
+            logger.exception("Error generating notifications")
+        finally:
+            connection.close()
+
+    threading.Thread(target=_run, daemon=True).start()
+
 def generate_notifications():
     """Generate notifications for near-expiry and low stock items"""
-    from datetime import timedelta
-    from django.db.models import Sum
-    from django.contrib.auth.models import User
-    
-    # Get all manager/admin users to notify
-    manager_users = User.objects.filter(
+
+    # The scan below touches every batch and medicine; don't repeat it for
+    # every dashboard hit. cache.add is atomic, so concurrent requests agree
+    # on who runs the scan and everyone else returns immediately.
+    if not cache.add('notifications:generated', True, 300):
+        return
+
+    # All manager/admin user ids to notify, materialized once up front.
+    # Only the pks are needed to build Notification rows.
+    manager_pks = list(User.objects.filter(
         Q(employee_profile__designations__role__role_name='Manager') | Q(is_superuser=True)
-    ).distinct()
-    
+    ).distinct().values_list('pk', flat=True))
+
+    today = timezone.now().date()
+    to_create = []
+
     # Check for near-expiry items (within 30 days)
-    thirty_days = timezone.now().date() + timedelta(days=30)
-    expiring_batches = StockBatch.objects.filter(
+    thirty_days = today + timedelta(days=30)
+    # select_related keeps batch.medicine off the per-row query path and
+    # only() trims each row to the columns the alert text needs.
+    expiring_batches = list(StockBatch.objects.filter(
         is_deleted=False,
         quantity__gt=0,
-        expiration_date__lte=thirty_days,
-        expiration_date__gte=timezone.now().date()
-    )
-    
+        expiry_date__lte=thirty_days,
+        expiry_date__gte=today
+    ).select_related('medicine').only(
+        'quantity', 'expiry_date', 'medicine__name'
+    ))
+
+    # Batches that already have an unread expiry notification, in one query
+    already_notified_batches = set(Notification.objects.filter(
+        notification_type='expiry',
+        related_batch_id__in=[b.pk for b in expiring_batches],
+        is_read=False
+    ).values_list('related_batch_id', flat=True))
+
     for batch in expiring_batches:
-        days_until_expiry = (batch.expiration_date - timezone.now().date()).days
-        # Check if notification already exists
-        existing = Notification.objects.filter(
-            notification_type='expiry',
-            related_batch=batch,
-            is_read=False
-        ).exists()
-        
-        if not existing:
-            for user in manager_users:
-                Notification.objects.create(
-                    user=user,
-                    notification_type='expiry',
-                    title=f'Near Expiry Alert: {batch.medicine.name}',
-                    message=f'Batch #{batch.batch_id} of {batch.medicine.name} will expire in {days_until_expiry} days (on {batch.expiration_date.strftime("%Y-%m-%d")}). Current stock: {batch.quantity} {batch.medicine.unit}',
-                    related_medicine=batch.medicine,
-                    related_batch=batch
-                )
-    
-    # Check for low stock items (below 20 pieces or less than 7 days of stock)
-    from django.db.models import F
+        if batch.pk in already_notified_batches:
+            continue
+        days_until_expiry = (batch.expiry_date - today).days
+        for user_pk in manager_pks:
+            to_create.append(Notification(
+                user_id=user_pk,
+                notification_type='expiry',
+                title=f'Near Expiry Alert: {batch.medicine.name}',
+                message=f'Batch #{batch.pk} of {batch.medicine.name} will expire in {days_until_expiry} days (on {batch.expiry_date.strftime("%Y-%m-%d")}). Current stock: {batch.quantity} boxes',
+                related_medicine=batch.medicine,
+                related_batch=batch
+            ))
+
+    # Check for low stock items (below 20 pieces or less than 7 days of stock).
+    # Stock totals and 30-day sales are annotated as correlated subqueries:
+    # putting two multi-valued Sum() joins in one annotate() fans out into a
+    # batches x sale_lines product and double-counts both totals.
+    thirty_days_ago = timezone.now() - timedelta(days=30)
     medicines = Medicine.objects.filter(is_deleted=False).annotate(
-        total_stock=Sum('batches__quantity', filter=Q(batches__is_deleted=False))
+        total_stock=Subquery(
+            StockBatch.objects.filter(medicine=OuterRef('pk'), is_deleted=False)
+            .order_by().values('medicine')
+            .annotate(t=Sum('quantity')).values('t')
+        ),
+        sales_last_30=Subquery(
+            SaleLineItem.objects.filter(
+                medicine=OuterRef('pk'), sale__sale_date__gte=thirty_days_ago
+            ).order_by().values('medicine')
+            .annotate(t=Sum('pieces_dispensed')).values('t')
+        ),
     )
-    
-    # Calculate daily sales rate
-    thirty_days_ago = timezone.now() - timedelta(days=30)
+
+    # Medicines that already have an unread stock notification, in one query
+    already_notified_medicines = set(Notification.objects.filter(
+        notification_type__in=['low_stock', 'out_of_stock'],
+        is_read=False
+    ).values_list('notification_type', 'related_medicine_id'))
+
     for medicine in medicines:
         if medicine.total_stock is not None:
-            # Get sales in last 30 days
-            sales_last_30 = SaleLineItem.objects.filter(
-                medicine=medicine,
-                sale__sale_date__gte=thirty_days_ago
-            ).aggregate(total=Sum('pieces_dispensed'))['total'] or 0
-            
+            sales_last_30 = medicine.sales_last_30 or 0
             daily_sales = sales_last_30 / 30 if sales_last_30 > 0 else 0
             days_of_stock = medicine.total_stock / daily_sales if daily_sales > 0 else 999
-            
+
             # Low stock: less than 7 days OR less than 20 pieces
             if (days_of_stock < 7 and daily_sales > 0) or medicine.total_stock < 20:
-                # Check if notification already exists
-                existing = Notification.objects.filter(
-                    notification_type='low_stock',
-                    related_medicine=medicine,
-                    is_read=False
-                ).exists()
-                
-                if not existing:
-                    for user in manager_users:
-                        if days_of_stock < 7 and daily_sales > 0:
-                            message = f'{medicine.name} has only {days_of_stock:.1f} days of stock remaining ({medicine.total_stock} {medicine.unit}). Average daily sales: {daily_sales:.1f}. Please reorder soon.'
-                        else:
-                            message = f'{medicine.name} is low in stock ({medicine.total_stock} {medicine.unit}). Please reorder soon.'
-                        
-                        Notification.objects.create(
-                            user=user,
-                            notification_type='low_stock',
-                            title=f'Low Stock Alert: {medicine.name}',
-                            message=message,
-                            related_medicine=medicine
-                        )
-        elif medicine.total_stock == 0 or medicine.total_stock is None:
-            # Out of stock
-            existing = Notification.objects.filter(
-                notification_type='out_of_stock',
-                related_medicine=medicine,
-                is_read=False
-            ).exists()
-            
-            if not existing:
-                for user in manager_users:
-                    Notification.objects.create(
-                        user=user,
-                        notification_type='out_of_stock',
-                        title=f'Out of Stock: {medicine.name}',
-                        message=f'{medicine.name} is currently out of stock. Please reorder immediately.',
+                if ('low_stock', medicine.pk) in already_notified_medicines:
+                    continue
+                if days_of_stock < 7 and daily_sales > 0:
+                    message = f'{medicine.name} has only {days_of_stock:.1f} days of stock remaining ({medicine.total_stock} in stock). Average daily sales: {daily_sales:.1f}. Please reorder soon.'
+                else:
+                    message = f'{medicine.name} is low in stock ({medicine.total_stock} in stock). Please reorder soon.'
+
+                for user_pk in manager_pks:
+                    to_create.append(Notification(
+                        user_id=user_pk,
+                        notification_type='low_stock',
+                        title=f'Low Stock Alert: {medicine.name}',
+                        message=message,
                         related_medicine=medicine
-                    )
+                    ))
+        else:
+            # Out of stock
+            if ('out_of_stock', medicine.pk) in already_notified_medicines:
+                continue
+            for user_pk in manager_pks:
+                to_create.append(Notification(
+                    user_id=user_pk,
+                    notification_type='out_of_stock',
+                    title=f'Out of Stock: {medicine.name}',
+                    message=f'{medicine.name} is currently out of stock. Please reorder immediately.',
+                    related_medicine=medicine
+                ))
+
+    if to_create:
+        Notification.objects.bulk_create(to_create, batch_size=1000)
 
 # --------------------------- DASHBOARD ---------------------------
 class DashboardView(LoginRequiredMixin, ListView):
@@ -355,15 +485,13 @@ class DashboardView(LoginRequiredMixin, ListView):
             latest_sale = None
         context["sale"] = latest_sale
         user = self.request.user
-        context["is_manager_or_admin"] = is_manager_or_admin(user)
+        is_mgr = is_manager_or_admin(user)
+        context["is_manager_or_admin"] = is_mgr
         context["user_role"] = get_user_role_display(user)
-        
-        # Generate notifications for managers
-        if is_manager_or_admin(user):
-            try:
-                generate_notifications()
-            except Exception as e:
-                print(f"Error generating notifications: {e}")
+
+        # Generate notifications for managers without blocking the dashboard
+        if is_mgr:
+            generate_notifications_async()
         
         # Get unread notification count
         context['unread_notifications'] = Notification.objects.filter(
@@ -378,9 +506,6 @@ class DashboardView(LoginRequiredMixin, ListView):
     
     def get_stock_analysis(self):
         """Calculate stock analysis metrics."""
-        from django.db.models import Sum, Count, F, Q
-        from datetime import timedelta
-        from django.utils.timezone import now
         
         # Calculate sales velocity (last 30 days)
         thirty_days_ago = now() - timedelta(days=30)
@@ -416,39 +541,38 @@ class DashboardView(LoginRequiredMixin, ListView):
             .order_by('-current_stock')[:5]
         )
         
-        # Overstock: Medicines with high inventory relative to sales
+        # Overstock / Understock: medicines with high or low inventory relative
+        # to sales. Both lists come from one pass over a single annotated
+        # queryset; the aggregates are correlated subqueries because two
+        # multi-valued Sum() joins in one annotate() would fan out into a
+        # batches x sale_lines product and double-count both totals.
         overstock = []
-        for medicine in Medicine.objects.filter(is_deleted=False).annotate(
-            current_stock=Sum('batches__quantity', filter=Q(batches__is_deleted=False)),
-            sales_last_30=Sum(
-                'sale_lines__pieces_dispensed',
-                filter=Q(sale_lines__sale__sale_date__gte=thirty_days_ago)
-            )
-        ):
-            if medicine.current_stock and medicine.current_stock > 0:
-                daily_sales = (medicine.sales_last_30 or 0) / 30
-                if daily_sales > 0:
-                    days_of_stock = medicine.current_stock / daily_sales
-                    if days_of_stock > 90:  # More than 3 months of stock
-                        overstock.append({
-                            'name': medicine.name,
-                            'id': medicine.id,
-                            'current_stock': medicine.current_stock,
-                            'days_of_stock': round(days_of_stock, 1)
-                        })
-        overstock = sorted(overstock, key=lambda x: x['days_of_stock'], reverse=True)[:5]
-        
-        # Understock: Medicines with low inventory relative to sales
         understock = []
-        for medicine in Medicine.objects.filter(is_deleted=False).annotate(
-            current_stock=Sum('batches__quantity', filter=Q(batches__is_deleted=False)),
-            sales_last_30=Sum(
-                'sale_lines__pieces_dispensed',
-                filter=Q(sale_lines__sale__sale_date__gte=thirty_days_ago)
-            )
-        ):
+        annotated = Medicine.objects.filter(is_deleted=False).annotate(
+            current_stock=Subquery(
+                StockBatch.objects.filter(medicine=OuterRef('pk'), is_deleted=False)
+                .order_by().values('medicine')
+                .annotate(t=Sum('quantity')).values('t')
+            ),
+            sales_last_30=Subquery(
+                SaleLineItem.objects.filter(
+                    medicine=OuterRef('pk'), sale__sale_date__gte=thirty_days_ago
+                ).order_by().values('medicine')
+                .annotate(t=Sum('pieces_dispensed')).values('t')
+            ),
+        )
+        for medicine in annotated:
+            daily_sales = (medicine.sales_last_30 or 0) / 30
+            if medicine.current_stock and medicine.current_stock > 0 and daily_sales > 0:
+                days_of_stock = medicine.current_stock / daily_sales
+                if days_of_stock > 90:  # More than 3 months of stock
+                    overstock.append({
+                        'name': medicine.name,
+                        'id': medicine.id,
+                        'current_stock': medicine.current_stock,
+                        'days_of_stock': round(days_of_stock, 1)
+                    })
             if medicine.sales_last_30 and medicine.sales_last_30 > 0:
-                daily_sales = medicine.sales_last_30 / 30
                 current = medicine.current_stock or 0
                 days_of_stock = current / daily_sales if daily_sales > 0 else 999
                 if days_of_stock < 7:  # Less than a week of stock
@@ -459,6 +583,7 @@ class DashboardView(LoginRequiredMixin, ListView):
                         'days_of_stock': round(days_of_stock, 1),
                         'daily_sales': round(daily_sales, 1)
                     })
+        overstock = sorted(overstock, key=lambda x: x['days_of_stock'], reverse=True)[:5]
         understock = sorted(understock, key=lambda x: x['days_of_stock'])[:5]
         
         return {
@@ -469,17 +594,31 @@ class DashboardView(LoginRequiredMixin, ListView):
         }
 
 # --------------------------- ACTIVITY LOG ---------------------------
+class CachedCountPaginator(Paginator):
+    """Paginator that caches the total count for a minute.
+
+    ListView pagination runs COUNT(*) over the whole filtered queryset on
+    every page hit; for a large activity log that rescan dominates the
+    request. Browsing between pages of the same filter reuses the cached
+    total instead.
+    """
+
+    @cached_property
+    def count(self):
+        key = f"activitylog:count:{hash(str(self.object_list.query))}"
+        return cache.get_or_set(key, lambda: self.object_list.count(), 60)
+
 class ActivityLogListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     model = ActivityLog
     template_name = "dashboard/activity_logs.html"
     context_object_name = "logs"
     paginate_by = 100
+    paginator_class = CachedCountPaginator
 
     def test_func(self):
         return is_manager_or_admin(self.request.user)
     
     def handle_no_permission(self):
-        from django.shortcuts import render
         context = {
             'user_role': get_user_role_display(self.request.user),
             'is_manager_or_admin': False
@@ -511,7 +650,7 @@ class ActivityLogListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['users'] = User.objects.filter(is_active=True).order_by('username')
+        context['users'] = User.objects.filter(is_active=True).only('id', 'username').order_by('username')
         context['selected_user'] = self.request.GET.get('user', '')
         context['start_date'] = self.request.GET.get('start_date', '')
         context['end_date'] = self.request.GET.get('end_date', '')
@@ -521,13 +660,57 @@ class ActivityLogListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return context
 
 def log_activity(user, action):
-    ActivityLog.objects.create(user=user, action=action)
+    """Record an activity log entry.
+
+    When called inside transaction.atomic() the insert is deferred with
+    on_commit, so it rides after the main transaction instead of adding a
+    write round-trip in the middle of it (and is dropped on rollback).
+    """
+    if connection.in_atomic_block:
+        transaction.on_commit(
+            lambda: ActivityLog.objects.create(user=user, action=action)
+        )
+    else:
+        ActivityLog.objects.create(user=user, action=action)
+
+def get_medicine_filter_choices():
+    """Medicine filter dropdown (id/name/brand), cached briefly.
+
+    The Medicine post_save/post_delete signal clears the key, so renames
+    and soft-deletes show up immediately.
+    """
+    return cache.get_or_set(
+        'med_filter_choices',
+        lambda: list(
+            Medicine.objects.filter(is_deleted=False)
+            .order_by('name')
+            .values('id', 'name', 'brand')
+        ),
+        timeout=300,
+    )
+
+
+def get_active_discount_types():
+    """Active discount types, cached briefly — the table rarely changes but
+    is read on every dispense form render. Invalidated on save/delete via
+    signals in base.models."""
+    return cache.get_or_set(
+        'active_discount_types',
+        lambda: list(DiscountType.objects.filter(is_active=True).order_by('discount_name')),
+        300,
+    )
+
+def get_active_payment_methods():
+    """Active payment methods, cached like get_active_discount_types."""
+    return cache.get_or_set(
+        'active_payment_methods',
+        lambda: list(PaymentMethod.objects.filter(is_active=True).order_by('method_name')),
+        300,
+    )
 
 # Decorator to restrict access to manager/admin only
 def manager_required(view_func):
     """Decorator to restrict access to managers and admins only"""
-    from functools import wraps
-    from django.shortcuts import render
     
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
@@ -550,7 +733,6 @@ class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return is_manager_or_admin(self.request.user)
     
     def handle_no_permission(self):
-        from django.shortcuts import render
         context = {
             'user_role': get_user_role_display(self.request.user),
             'is_manager_or_admin': False
@@ -558,7 +740,10 @@ class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return render(self.request, 'shared/access_denied.html', context, status=403)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # Pull the employee profile along with each user; the template's
+        # role column only reads is_superuser/is_staff, so there is
+        # nothing for a designations/role prefetch to feed.
+        queryset = super().get_queryset().select_related('employee_profile')
         search_input = self.request.GET.get("search") or ""
         if search_input:
             queryset = queryset.filter(username__icontains=search_input)
@@ -745,8 +930,11 @@ class BlockUnblockUserView(LoginRequiredMixin, UserPassesTestMixin, View):
             messages.error(request, "You cannot block yourself.")
             return redirect("user-list")
 
-        user.is_active = not user.is_active
-        user.save()
+        # Narrow UPDATE for a one-bit flip instead of rewriting every
+        # column on the user row with save().
+        new_state = not user.is_active
+        User.objects.filter(pk=pk).update(is_active=new_state)
+        user.is_active = new_state
 
         action = "unblocked" if user.is_active else "blocked"
         ActivityLog.objects.create(user=request.user,action=f"{action.capitalize()} account: {user.username}")
@@ -826,7 +1014,6 @@ class MedicineListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return is_manager_or_admin(self.request.user)
     
     def handle_no_permission(self):
-        from django.shortcuts import render
         context = {
             'user_role': get_user_role_display(self.request.user),
             'is_manager_or_admin': False
@@ -834,7 +1021,16 @@ class MedicineListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return render(self.request, 'shared/access_denied.html', context, status=403)
     
     def get_queryset(self):
-        queryset = Medicine.objects.filter(is_deleted=False)
+        # The list renders category and product_type per row (and
+        # ProductType.__str__ reaches through to its category), so pull all
+        # three in the same query and trim to the columns the template shows.
+        queryset = Medicine.objects.filter(is_deleted=False).select_related(
+            'category', 'product_type__category'
+        ).only(
+            'name', 'brand', 'dosage_form', 'strength',
+            'base_price', 'selling_price',
+            'category__name', 'product_type__name', 'product_type__category__name',
+        )
         search_query = self.request.GET.get('search', '')
         
         if search_query:
@@ -863,7 +1059,6 @@ class MedicineCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return is_manager_or_admin(self.request.user)
     
     def handle_no_permission(self):
-        from django.shortcuts import render
         context = {
             'user_role': get_user_role_display(self.request.user),
             'is_manager_or_admin': False
@@ -897,31 +1092,106 @@ class MedicineUpdateView(LoginRequiredMixin, UpdateView):
         return response
 
 # --------------------------- MODAL: MEDICINE UPDATE (AJAX) ---------------------------
-from django.views.decorators.http import require_http_methods
-from django.utils.decorators import method_decorator
-from django.template.loader import render_to_string
 from django.middleware import csrf
 
+# Modal forms live at module scope so each AJAX hit reuses the class
+# instead of re-running ModelForm metaclass introspection per request.
+# Django deep-copies each field (and clones its queryset) per instance,
+# so the class-level querysets stay fresh.
+class MedicineModalForm(forms.ModelForm):
+    class Meta:
+        model = Medicine
+        fields = ['name','brand','category','product_type','dosage_form','strength','units_per_pack','packs_per_box','description']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Add placeholders
+        self.fields['name'].widget.attrs.update({'placeholder': 'Enter medicine name'})
+        self.fields['brand'].widget.attrs.update({'placeholder': 'Enter brand name'})
+        self.fields['dosage_form'].widget.attrs.update({'placeholder': 'e.g., Tablet, Capsule, Syrup'})
+        self.fields['strength'].widget.attrs.update({'placeholder': 'e.g., 500mg, 250mg/5mL'})
+        self.fields['units_per_pack'].widget.attrs.update({'placeholder': 'Pieces per pack'})
+        self.fields['packs_per_box'].widget.attrs.update({'placeholder': 'Packs per box'})
+        self.fields['description'].widget.attrs.update({'placeholder': 'Product description (optional)'})
+
+class MedicinePriceModalForm(forms.ModelForm):
+    class Meta:
+        model = Medicine
+        fields = ['base_price','selling_price']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Add placeholders
+        self.fields['base_price'].widget.attrs.update({'placeholder': 'Enter base price (e.g., 5.50)'})
+        self.fields['selling_price'].widget.attrs.update({'placeholder': 'Enter selling price (e.g., 7.00)'})
+
+class StockBatchModalForm(forms.ModelForm):
+    class Meta:
+        model = StockBatch
+        fields = ["medicine", "quantity", "expiry_date", "location"]
+
+class MedicineCreateModalForm(forms.ModelForm):
+    class Meta:
+        model = Medicine
+        fields = ['name','brand','category','product_type','dosage_form','strength','units_per_pack','packs_per_box','base_price','selling_price','description']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Add placeholders
+        self.fields['name'].widget.attrs.update({'placeholder': 'Enter medicine name (e.g., Paracetamol)'})
+        self.fields['brand'].widget.attrs.update({'placeholder': 'Enter brand name (e.g., Biogesic)'})
+        self.fields['dosage_form'].widget.attrs.update({'placeholder': 'e.g., Tablet, Capsule, Syrup'})
+        self.fields['strength'].widget.attrs.update({'placeholder': 'e.g., 500mg, 250mg/5mL'})
+        self.fields['units_per_pack'].widget.attrs.update({'placeholder': 'Pieces per pack'})
+        self.fields['packs_per_box'].widget.attrs.update({'placeholder': 'Packs per box'})
+        self.fields['base_price'].widget.attrs.update({'placeholder': 'Enter base price (e.g., 5.50)'})
+        self.fields['selling_price'].widget.attrs.update({'placeholder': 'Enter selling price (e.g., 7.00)'})
+        self.fields['description'].widget.attrs.update({'placeholder': 'Product description (optional)'})
+
+        # Single queryset assignment: narrowed by category when one was
+        # posted, all product types otherwise (user selects category first).
+        pt_qs = ProductType.objects.filter(is_deleted=False)
+        if 'category' in self.data:
+            try:
+                pt_qs = pt_qs.filter(category_id=int(self.data.get('category')))
+            except (ValueError, TypeError):
+                pass
+        self.fields['product_type'].queryset = pt_qs.order_by('name')
+        self.fields['product_type'].required = False  # Make optional since it depends on category
+
+class StockBatchCreateModalForm(forms.ModelForm):
+    # Override to show only PO field and medicine will be selected from PO
+    purchase_order = forms.ModelChoiceField(
+        queryset=PurchaseOrder.objects.filter(is_deleted=False, status='Received').order_by('-created_at'),
+        required=True,
+        label="Select Received Purchase Order",
+        empty_label="-- Select Purchase Order --"
+    )
+    po_line = forms.ModelChoiceField(
+        queryset=PurchaseOrderLine.objects.none(),
+        required=True,
+        label="Select Medicine from Order",
+        empty_label="-- Select Medicine --"
+    )
+
+    class Meta:
+        model = StockBatch
+        fields = ["quantity", "date_received", "is_recalled"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'purchase_order' in self.data:
+            try:
+                po_id = int(self.data.get('purchase_order'))
+                self.fields['po_line'].queryset = PurchaseOrderLine.objects.filter(purchase_order_id=po_id)
+            except (ValueError, TypeError):
+                pass
+
 @login_required
 def medicine_update_modal(request, pk):
     medicine = get_object_or_404(Medicine, pk=pk)
 
-    class MedicineModalForm(forms.ModelForm):
-        class Meta:
-            model = Medicine
-            fields = ['name','brand','category','product_type','dosage_form','strength','units_per_pack','packs_per_box','description']
-        
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            # Add placeholders
-            self.fields['name'].widget.attrs.update({'placeholder': 'Enter medicine name'})
-            self.fields['brand'].widget.attrs.update({'placeholder': 'Enter brand name'})
-            self.fields['dosage_form'].widget.attrs.update({'placeholder': 'e.g., Tablet, Capsule, Syrup'})
-            self.fields['strength'].widget.attrs.update({'placeholder': 'e.g., 500mg, 250mg/5mL'})
-            self.fields['units_per_pack'].widget.attrs.update({'placeholder': 'Pieces per pack'})
-            self.fields['packs_per_box'].widget.attrs.update({'placeholder': 'Packs per box'})
-            self.fields['description'].widget.attrs.update({'placeholder': 'Product description (optional)'})
-
     if request.method == 'POST':
         form = MedicineModalForm(request.POST, instance=medicine)
         if form.is_valid():
@@ -943,27 +1213,17 @@ def medicine_price_update_modal(request, pk):
     if not is_manager_or_admin(request.user):
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
 
-    class MedicinePriceModalForm(forms.ModelForm):
-        class Meta:
-            model = Medicine
-            fields = ['base_price','selling_price']
-        
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            # Add placeholders
-            self.fields['base_price'].widget.attrs.update({'placeholder': 'Enter base price (e.g., 5.50)'})
-            self.fields['selling_price'].widget.attrs.update({'placeholder': 'Enter selling price (e.g., 7.00)'})
-
     if request.method == 'POST':
+        # Snapshot prices before binding the form: is_valid() writes the
+        # posted values onto the instance, and the row is already loaded,
+        # so re-fetching it just for the old values wastes a query.
+        old_base, old_sell = medicine.base_price, medicine.selling_price
         form = MedicinePriceModalForm(request.POST, instance=medicine)
         reason = request.POST.get('reason', 'Price adjustment via modal')
         if form.is_valid():
-            old = Medicine.objects.get(pk=medicine.pk)
-            old_base, old_sell = old.base_price, old.selling_price
             updated = form.save()
             new_base, new_sell = updated.base_price, updated.selling_price
             if old_base != new_base or old_sell != new_sell:
-                from base.models import PriceHistory
                 PriceHistory.objects.create(
                     medicine=medicine,
                     old_base_price=old_base,
@@ -990,11 +1250,6 @@ def medicine_price_update_modal(request, pk):
 def batch_update_modal(request, pk):
     batch = get_object_or_404(StockBatch, pk=pk)
 
-    class StockBatchModalForm(forms.ModelForm):
-        class Meta:
-            model = StockBatch
-            fields = ["medicine", "quantity", "expiry_date", "location"]
-
     if request.method == 'POST':
         form = StockBatchModalForm(request.POST, instance=batch)
         if form.is_valid():
@@ -1009,39 +1264,24 @@ def batch_update_modal(request, pk):
         html = render_to_string('medicine/partials/batch_form_modal.html', {'form': form, 'batch': batch}, request=request)
         return JsonResponse({'success': True, 'html': html})
 
+def _cached_modal_html(cache_key, template_name, make_context, request):
+    """Serve a GET modal partial from cache with the caller's CSRF token.
+
+    The empty create-modal forms render the same HTML for everyone, so the
+    template is rendered once per TTL with a placeholder token and the
+    real per-session token is substituted on each hit.
+    """
+    html = cache.get(cache_key)
+    if html is None:
+        context = make_context()
+        context['csrf_token'] = 'CSRF_TOKEN_PLACEHOLDER'
+        html = render_to_string(template_name, context)
+        cache.set(cache_key, html, 30)
+    return html.replace('CSRF_TOKEN_PLACEHOLDER', csrf.get_token(request))
+
 # --------------------------- MODAL: MEDICINE CREATE (AJAX) ---------------------------
 @login_required
 def medicine_create_modal(request):
-    class MedicineCreateModalForm(forms.ModelForm):
-        class Meta:
-            model = Medicine
-            fields = ['name','brand','category','product_type','dosage_form','strength','units_per_pack','packs_per_box','base_price','selling_price','description']
-        
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            
-            # Add placeholders
-            self.fields['name'].widget.attrs.update({'placeholder': 'Enter medicine name (e.g., Paracetamol)'})
-            self.fields['brand'].widget.attrs.update({'placeholder': 'Enter brand name (e.g., Biogesic)'})
-            self.fields['dosage_form'].widget.attrs.update({'placeholder': 'e.g., Tablet, Capsule, Syrup'})
-            self.fields['strength'].widget.attrs.update({'placeholder': 'e.g., 500mg, 250mg/5mL'})
-            self.fields['units_per_pack'].widget.attrs.update({'placeholder': 'Pieces per pack'})
-            self.fields['packs_per_box'].widget.attrs.update({'placeholder': 'Packs per box'})
-            self.fields['base_price'].widget.attrs.update({'placeholder': 'Enter base price (e.g., 5.50)'})
-            self.fields['selling_price'].widget.attrs.update({'placeholder': 'Enter selling price (e.g., 7.00)'})
-            self.fields['description'].widget.attrs.update({'placeholder': 'Product description (optional)'})
-            
-            # Show all product types initially (user will select category first)
-            self.fields['product_type'].queryset = ProductType.objects.filter(is_deleted=False).order_by('name')
-            self.fields['product_type'].required = False  # Make optional since it depends on category
-            
-            if 'category' in self.data:
-                try:
-                    category_id = int(self.data.get('category'))
-                    self.fields['product_type'].queryset = ProductType.objects.filter(category_id=category_id, is_deleted=False).order_by('name')
-                except (ValueError, TypeError):
-                    pass
-
     if request.method == 'POST':
         try:
             form = MedicineCreateModalForm(request.POST)
@@ -1056,43 +1296,17 @@ def medicine_create_modal(request):
             # Ensure JSON is always returned to prevent client-side JSON parse errors
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
     else:
-        form = MedicineCreateModalForm()
-        html = render_to_string('medicine/partials/medicine_create_modal.html', {'form': form}, request=request)
+        html = _cached_modal_html(
+            'modal:create:medicine',
+            'medicine/partials/medicine_create_modal.html',
+            lambda: {'form': MedicineCreateModalForm()},
+            request,
+        )
         return JsonResponse({'success': True, 'html': html})
 
 # --------------------------- MODAL: BATCH CREATE (AJAX) ---------------------------
 @login_required
 def batch_create_modal(request):
-    from base.models import PurchaseOrder, PurchaseOrderLine
-    
-    class StockBatchCreateModalForm(forms.ModelForm):
-        # Override to show only PO field and medicine will be selected from PO
-        purchase_order = forms.ModelChoiceField(
-            queryset=PurchaseOrder.objects.filter(is_deleted=False, status='Received').order_by('-created_at'),
-            required=True,
-            label="Select Received Purchase Order",
-            empty_label="-- Select Purchase Order --"
-        )
-        po_line = forms.ModelChoiceField(
-            queryset=PurchaseOrderLine.objects.none(),
-            required=True,
-            label="Select Medicine from Order",
-            empty_label="-- Select Medicine --"
-        )
-        
-        class Meta:
-            model = StockBatch
-            fields = ["quantity", "date_received", "is_recalled"]
-        
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            if 'purchase_order' in self.data:
-                try:
-                    po_id = int(self.data.get('purchase_order'))
-                    self.fields['po_line'].queryset = PurchaseOrderLine.objects.filter(purchase_order_id=po_id)
-                except (ValueError, TypeError):
-                    pass
-
     if request.method == 'POST':
         form = StockBatchCreateModalForm(request.POST)
         if form.is_valid():
@@ -1163,37 +1377,51 @@ def batch_create_modal(request):
         html = render_to_string('medicine/partials/batch_create_modal.html', {'form': form}, request=request)
         return JsonResponse({'success': False, 'html': html}, status=400)
     else:
-        form = StockBatchCreateModalForm()
-        html = render_to_string('medicine/partials/batch_create_modal.html', {'form': form}, request=request)
+        html = _cached_modal_html(
+            'modal:create:batch',
+            'medicine/partials/batch_create_modal.html',
+            lambda: {'form': StockBatchCreateModalForm()},
+            request,
+        )
         return JsonResponse({'success': True, 'html': html})
 
 # --------------------------- BATCH RECEIVE FROM PO (FULL PAGE) ---------------------------
 @login_required
 def batch_receive_form(request):
     """Receive batch from purchase order - full page with all medicines"""
-    from base.models import PurchaseOrder, PurchaseOrderLine, StockBatch, StockMovement
-    
-    # Get all received purchase orders that still have items to receive
-    from django.db.models import Q, F
-    all_received_pos = PurchaseOrder.objects.filter(
-        is_deleted=False, 
-        status='Received'
-    ).prefetch_related('lines__medicine').order_by('-created_at')
-    
-    # Filter out POs where all lines are fully received
-    purchase_orders = []
-    for po in all_received_pos:
-        has_unreceived = any(
-            line.quantity_received < line.quantity_ordered 
-            for line in po.lines.all()
+    
+    # Received purchase orders that still have items to receive, filtered
+    # in SQL with an Exists subquery instead of hydrating every line row
+    # and scanning them in Python. Only selected_po needs its lines. The
+    # dropdown list changes rarely, so the evaluated rows are cached for
+    # 30s; a successful receive below drops the key immediately.
+    purchase_orders = cache.get('batch_receive:open_pos')
+    if purchase_orders is None:
+        unreceived = PurchaseOrderLine.objects.filter(
+            purchase_order=OuterRef('pk'),
+            quantity_received__lt=F('quantity_ordered')
         )
-        if has_unreceived:
-            purchase_orders.append(po)
+        purchase_orders = list(PurchaseOrder.objects.filter(
+            is_deleted=False,
+            status='Received'
+        ).annotate(
+            has_unreceived=Exists(unreceived),
+            line_count=Count('lines'),
+        ).filter(has_unreceived=True).order_by('-created_at'))
+        cache.set('batch_receive:open_pos', purchase_orders, 30)
     
     selected_po = None
     if request.GET.get('po'):
         try:
-            selected_po = PurchaseOrder.objects.prefetch_related('lines__medicine').get(
+            # Narrow the prefetched line rows to what the receive table
+            # renders plus the dates copied onto new batches.
+            selected_po = PurchaseOrder.objects.prefetch_related(
+                Prefetch('lines', queryset=PurchaseOrderLine.objects.select_related('medicine').only(
+                    'purchase_order_id', 'quantity_ordered', 'quantity_received',
+                    'manufactured_date', 'expiration_date',
+                    'medicine__name', 'medicine__packs_per_box', 'medicine__units_per_pack',
+                ))
+            ).get(
                 id=request.GET.get('po'),
                 is_deleted=False,
                 status='Received'
@@ -1211,82 +1439,118 @@ def batch_receive_form(request):
                 messages.error(request, "Missing required fields")
                 return redirect(f'batch-receive?po={po_id}')
             
-            from datetime import datetime
             date_received = datetime.strptime(date_received_str, '%Y-%m-%d').date()
             selected_po = PurchaseOrder.objects.get(id=po_id, is_deleted=False, status='Received')
-            
+
+            # Fetch every posted line in one query instead of one SELECT each
+            po_lines = {
+                str(line.id): line
+                for line in PurchaseOrderLine.objects.select_related('medicine').filter(
+                    id__in=line_ids, purchase_order=selected_po
+                )
+            }
+
+            # Medicines that already have a front batch, in one query
+            # instead of one exists() probe per line. Lines assigned
+            # "front" below are added so later lines go to "back".
+            front_set = set(StockBatch.objects.filter(
+                medicine_id__in={l.medicine_id for l in po_lines.values()},
+                is_deleted=False,
+                is_recalled=False,
+                location="front"
+            ).values_list('medicine_id', flat=True))
+
             batches_created = 0
             total_damaged = 0
-            
-            # Process each line item
-            for line_id in line_ids:
-                quantity_received = int(request.POST.get(f'quantity_received_{line_id}', 0))
-                quantity_damaged = int(request.POST.get(f'quantity_damaged_{line_id}', 0))
-                
-                if quantity_received <= 0:
-                    continue  # Skip if no quantity received
-                
-                po_line = PurchaseOrderLine.objects.get(id=line_id, purchase_order=selected_po)
-                
-                # Validate total doesn't exceed ordered
-                total = quantity_received + quantity_damaged
-                if total > po_line.quantity_ordered:
-                    messages.error(request, f"Total received + damaged ({total}) exceeds ordered quantity ({po_line.quantity_ordered}) for {po_line.medicine.name}")
-                    return redirect(f'batch-receive?po={po_id}')
-                
-                # Create batch for received (good) boxes
-                has_front = StockBatch.objects.filter(
-                    medicine=po_line.medicine, 
-                    is_deleted=False, 
-                    is_recalled=False, 
-                    location="front"
-                ).exists()
-                
-                batch = StockBatch.objects.create(
-                    medicine=po_line.medicine,
-                    quantity=quantity_received,
-                    loose_pieces=0,
-                    date_received=date_received,
-                    manufactured_date=po_line.manufactured_date,
-                    expiry_date=po_line.expiration_date,
-                    location="back" if has_front else "front",
-                    is_recalled=False
-                )
-                
-                # Calculate pieces for stock movement
-                medicine = batch.medicine
-                total_pieces = quantity_received * medicine.packs_per_box * medicine.units_per_pack
-                
-                # Create stock movement
-                remarks = f"Stock-in from PO #{selected_po.id} ({quantity_received} boxes)"
-                if quantity_damaged > 0:
-                    remarks += f" | Damaged: {quantity_damaged} boxes"
-                    total_damaged += quantity_damaged
-                
-                StockMovement.objects.create(
-                    medicine=medicine,
-                    batch=batch,
-                    from_location="",
-                    to_location=batch.location,
-                    quantity=total_pieces,
-                    reason="transfer",
-                    remarks=remarks,
-                    user=request.user
-                )
-                
-                # Update quantity received on the PO line
-                po_line.quantity_received += quantity_received + quantity_damaged
-                po_line.save()
-                
-                # Log activity
-                activity_msg = f"Added batch from PO #{selected_po.id}: {medicine.name} — {quantity_received} boxes ({total_pieces} pieces)"
-                if quantity_damaged > 0:
-                    activity_msg += f" | Damaged: {quantity_damaged} boxes"
-                log_activity(request.user, activity_msg)
-                
-                batches_created += 1
+            movements_to_create = []
+            activity_to_create = []
+            lines_to_update = []
+
+            # One transaction for the whole receive: either every line lands
+            # or none do, and the per-line writes share a single commit.
+            with transaction.atomic():
+                for line_id in line_ids:
+                    quantity_received = int(request.POST.get(f'quantity_received_{line_id}', 0))
+                    quantity_damaged = int(request.POST.get(f'quantity_damaged_{line_id}', 0))
+
+                    if quantity_received <= 0:
+                        continue  # Skip if no quantity received
+
+                    po_line = po_lines.get(str(line_id))
+                    if po_line is None:
+                        raise PurchaseOrderLine.DoesNotExist(
+                            f"Line {line_id} does not belong to PO #{selected_po.id}"
+                        )
+
+                    # Validate total doesn't exceed ordered
+                    total = quantity_received + quantity_damaged
+                    if total > po_line.quantity_ordered:
+                        transaction.set_rollback(True)
+                        messages.error(request, f"Total received + damaged ({total}) exceeds ordered quantity ({po_line.quantity_ordered}) for {po_line.medicine.name}")
+                        return redirect(f'batch-receive?po={po_id}')
+
+                    # Create batch for received (good) boxes
+                    has_front = po_line.medicine_id in front_set
+                    if not has_front:
+                        front_set.add(po_line.medicine_id)
+
+                    # Created per row (not bulk) because the movement rows
+                    # below need the batch pks, which MySQL can't return
+                    # from a bulk insert.
+                    batch = StockBatch.objects.create(
+                        medicine=po_line.medicine,
+                        quantity=quantity_received,
+                        loose_pieces=0,
+                        date_received=date_received,
+                        manufactured_date=po_line.manufactured_date,
+                        expiry_date=po_line.expiration_date,
+                        location="back" if has_front else "front",
+                        is_recalled=False
+                    )
+
+                    # Calculate pieces for stock movement
+                    medicine = po_line.medicine
+                    total_pieces = quantity_received * medicine.packs_per_box * medicine.units_per_pack
+
+                    # Create stock movement
+                    remarks = f"Stock-in from PO #{selected_po.id} ({quantity_received} boxes)"
+                    if quantity_damaged > 0:
+                        remarks += f" | Damaged: {quantity_damaged} boxes"
+                        total_damaged += quantity_damaged
+
+                    movements_to_create.append(StockMovement(
+                        medicine=medicine,
+                        batch=batch,
+                        from_location="",
+                        to_location=batch.location,
+                        quantity=total_pieces,
+                        reason="transfer",
+                        remarks=remarks,
+                        user=request.user
+                    ))
+
+                    # Update quantity received on the PO line
+                    po_line.quantity_received += quantity_received + quantity_damaged
+                    lines_to_update.append(po_line)
+
+                    # Log activity
+                    activity_msg = f"Added batch from PO #{selected_po.id}: {medicine.name} — {quantity_received} boxes ({total_pieces} pieces)"
+                    if quantity_damaged > 0:
+                        activity_msg += f" | Damaged: {quantity_damaged} boxes"
+                    activity_to_create.append(ActivityLog(user=request.user, action=activity_msg))
+
+                    batches_created += 1
+
+                # One write per table for the whole PO instead of one per line
+                if lines_to_update:
+                    PurchaseOrderLine.objects.bulk_update(lines_to_update, ['quantity_received'])
+                if movements_to_create:
+                    StockMovement.objects.bulk_create(movements_to_create, batch_size=500)
+                if activity_to_create:
+                    ActivityLog.objects.bulk_create(activity_to_create, batch_size=500)
             
             if batches_created > 0:
+                cache.delete('batch_receive:open_pos')
                 success_msg = f"Successfully received {batches_created} batch(es) from PO #{selected_po.id}"
                 if total_damaged > 0:
                     success_msg += f" (Total damaged: {total_damaged} boxes)"
@@ -1311,7 +1575,14 @@ def batch_receive_form(request):
 # --------------------------- MODAL: BATCH RECALL (AJAX) ---------------------------
 @login_required
 def batch_recall_modal(request, pk):
-    batch = get_object_or_404(StockBatch, pk=pk)
+    # pieces_in_boxes is computed in the same query (quantity x pack factors)
+    # so the GET render does no per-request arithmetic of its own
+    batch = get_object_or_404(
+        StockBatch.objects.select_related('medicine').annotate(
+            pieces_in_boxes=F('quantity') * F('medicine__packs_per_box') * F('medicine__units_per_pack')
+        ),
+        pk=pk,
+    )
     
     if request.method == 'POST':
         try:
@@ -1328,34 +1599,40 @@ def batch_recall_modal(request, pk):
             medicine = batch.medicine
             pieces_recalled = recall_quantity * medicine.packs_per_box * medicine.units_per_pack
             
-            # Create stock movement for recall
-            StockMovement.objects.create(
-                medicine=medicine,
-                batch=batch,
-                from_location=batch.location,
-                to_location="",
-                quantity=pieces_recalled,
-                reason="recall",
-                remarks=f"Recalled {recall_quantity} box(es) - Reason: {reason}",
-                user=request.user
-            )
-            
-            # Update batch quantity
-            batch.quantity -= recall_quantity
-            
-            # If entire batch recalled, mark as recalled
-            if batch.quantity <= 0:
-                batch.is_recalled = True
-                batch.quantity = 0
-            
-            batch.save()
-            # Auto-promote back to front if front is empty after recall
+            # Guarded atomic decrement first: the DB applies the delta, so
+            # a concurrent dispense or recall can't be overwritten with the
+            # stale in-memory quantity, and over-recalls match zero rows.
+            # The movement row is only written after the decrement succeeds
+            # — inserting it first would leave a phantom recall record when
+            # the guard loses the race — and shares its transaction.
+            with transaction.atomic():
+                updated = StockBatch.objects.filter(
+                    pk=batch.pk, quantity__gte=recall_quantity
+                ).update(quantity=F('quantity') - recall_quantity)
+                if updated == 0:
+                    return JsonResponse({'success': False, 'error': f'Cannot recall {recall_quantity} boxes. Stock changed while the form was open.'}, status=400)
+                # If the entire batch is now gone, mark it recalled
+                StockBatch.objects.filter(pk=batch.pk, quantity__lte=0).update(
+                    quantity=0, is_recalled=True
+                )
+                StockMovement.objects.create(
+                    medicine=medicine,
+                    batch=batch,
+                    from_location=batch.location,
+                    to_location="",
+                    quantity=pieces_recalled,
+                    reason="recall",
+                    remarks=f"Recalled {recall_quantity} box(es) - Reason: {reason}",
+                    user=request.user
+                )
+            # Auto-promote back to front if front is empty after recall.
+            # Fetch the promotion candidate first so the front exists() check
+            # only runs when there is actually a back batch to promote.
             try:
-                from base.models import StockBatch as SB
-                has_front = SB.objects.filter(medicine=medicine, is_deleted=False, is_recalled=False, location='front').exists()
-                if not has_front:
-                    back_batch = SB.objects.filter(medicine=medicine, is_deleted=False, is_recalled=False, location='back').order_by('date_received').first()
-                    if back_batch:
+                back_batch = StockBatch.objects.filter(medicine=medicine, is_deleted=False, is_recalled=False, location='back').order_by('date_received').first()
+                if back_batch:
+                    has_front = StockBatch.objects.filter(medicine=medicine, is_deleted=False, is_recalled=False, location='front').exists()
+                    if not has_front:
                         total_pieces_move = back_batch.quantity * (medicine.packs_per_box or 1) * (medicine.units_per_pack or 1)
                         back_batch.location = 'front'
                         back_batch.save()
@@ -1392,7 +1669,7 @@ def batch_recall_modal(request, pk):
             'batch': batch,
             'medicine': batch.medicine,
             'max_quantity': batch.quantity,
-            'total_pieces': batch.quantity * batch.medicine.packs_per_box * batch.medicine.units_per_pack
+            'total_pieces': batch.pieces_in_boxes
         }
         html = render_to_string('medicine/partials/batch_recall_modal.html', context, request=request)
         return JsonResponse({'success': True, 'html': html})
@@ -1419,24 +1696,28 @@ class MedicinePriceUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateVie
         # Only managers and admins can update prices
         return is_manager_or_admin(self.request.user)
 
+    def get_queryset(self):
+        # The template shows the medicine's category; join it up front
+        return Medicine.objects.select_related('category')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['medicine'] = self.object
-        # Get price history for this medicine
-        from base.models import PriceHistory
+        # Get price history for this medicine. select_related pulls the
+        # changed_by user the template prints per row (a sliced queryset
+        # can't go in a Prefetch, so this stays its own single query).
         context['price_history'] = PriceHistory.objects.filter(
             medicine=self.object
-        ).order_by('-change_date')[:5]  # Last 5 changes
+        ).select_related('changed_by').order_by('-change_date')[:5]  # Last 5 changes
         return context
 
     def form_valid(self, form):
-        # Get the original object before saving changes
-        old_medicine = Medicine.objects.get(pk=self.object.pk)
-        
-        # Check if prices have changed
-        old_base = old_medicine.base_price
+        # No re-fetch needed: form.initial snapshotted the prices from the
+        # instance before binding (validation has already copied the new
+        # values onto self.object by now, so the instance can't be used)
+        old_base = form.initial['base_price']
         new_base = form.cleaned_data['base_price']
-        old_selling = old_medicine.selling_price
+        old_selling = form.initial['selling_price']
         new_selling = form.cleaned_data['selling_price']
         
         # Get reason from form if provided
@@ -1447,7 +1728,6 @@ class MedicinePriceUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateVie
         
         # Record price change if prices changed
         if old_base != new_base or old_selling != new_selling:
-            from base.models import PriceHistory
             PriceHistory.objects.create(
                 medicine=self.object,
                 old_base_price=old_base,
@@ -1478,12 +1758,16 @@ class StockBatchListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         # Show only active batches with positive stock (boxes or loose pieces)
-        from django.db.models import Q
         return (
             StockBatch.objects
             .filter(is_deleted=False, is_recalled=False)
             .filter(Q(quantity__gt=0) | Q(loose_pieces__gt=0))
             .select_related('medicine')
+            # Only the columns the list template renders
+            .only(
+                'quantity', 'location', 'expiry_date', 'date_received',
+                'is_recalled', 'medicine__name', 'medicine__brand',
+            )
             .order_by('medicine__name', 'date_received')
         )
     
@@ -1559,17 +1843,13 @@ class StockBatchDeleteView(LoginRequiredMixin, DeleteView):
 @manager_required
 def batch_stockout_expired(request, pk):
     """Stock out expired batch with proper movement tracking"""
-    from base.models import StockBatch, StockMovement
-    from datetime import date
-    from django.template.loader import render_to_string
     
-    batch = get_object_or_404(StockBatch, pk=pk, is_deleted=False)
+    batch = get_object_or_404(StockBatch.objects.select_related('medicine'), pk=pk, is_deleted=False)
     
     # Verify batch is expired or expiring within 6 months (store policy)
-    from datetime import timedelta
     six_months_from_now = date.today() + timedelta(days=180)
     if batch.expiry_date and batch.expiry_date > six_months_from_now:
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        if is_xhr(request):
             return JsonResponse({'error': 'This batch is not within the 6-month expiry window per store policy.'}, status=400)
         messages.warning(request, "This batch is not within the 6-month expiry window per store policy.")
         return redirect('expiration-monitor')
@@ -1579,14 +1859,13 @@ def batch_stockout_expired(request, pk):
             # Get reason from JSON body
             reason = ""
             if request.content_type == 'application/json':
-                import json
                 data = json.loads(request.body)
                 reason = data.get('reason', '').strip()
             else:
                 reason = request.POST.get('reason', '').strip()
             
             if not reason:
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                if is_xhr(request):
                     return JsonResponse({'error': 'Reason for removal is required.'}, status=400)
                 messages.error(request, "Reason for removal is required.")
                 return redirect('expiration-monitor')
@@ -1616,19 +1895,19 @@ def batch_stockout_expired(request, pk):
             # Soft delete the batch
             batch.delete()
             
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_xhr(request):
                 return JsonResponse({'success': True})
             messages.success(request, f"Expired batch #{batch.id} successfully removed from inventory.")
             return redirect('expiration-monitor')
             
         except Exception as e:
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_xhr(request):
                 return JsonResponse({'error': str(e)}, status=400)
             messages.error(request, f"Error removing expired batch: {str(e)}")
             return redirect('expiration-monitor')
     
     # GET request - show confirmation (modal or page)
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+    if is_xhr(request):
         html = render_to_string('medicine/partials/batch_stockout_modal.html', {'batch': batch}, request=request)
         return JsonResponse({'html': html})
     
@@ -1642,14 +1921,18 @@ def batch_stockout_expired(request, pk):
 # --------------------------- MULTI-ITEM DISPENSE FORM & VIEW ---------------------------
 class DispenseLineItemForm(forms.Form):
     """Single line form for one medicine in a multi-item sale."""
-    # Only show medicines that actually have stock in batches
+    # Only show medicines that actually have stock in batches. An Exists
+    # subquery instead of the join + DISTINCT: the join fans out per batch
+    # and makes the database deduplicate the result again.
     medicine = forms.ModelChoiceField(
-        queryset=Medicine.objects.filter(
-            Q(batches__quantity__gt=0) | Q(batches__loose_pieces__gt=0),
-            is_deleted=False,
-            batches__is_deleted=False,
-            batches__is_recalled=False,
-        ).distinct().order_by('name'),
+        queryset=Medicine.objects.filter(is_deleted=False).annotate(
+            has_stock=Exists(StockBatch.objects.filter(
+                Q(quantity__gt=0) | Q(loose_pieces__gt=0),
+                medicine=OuterRef('pk'),
+                is_deleted=False,
+                is_recalled=False,
+            ))
+        ).filter(has_stock=True).order_by('name'),
         label="Medicine",
         widget=forms.Select(attrs={'class': 'form-control medicine-select'})
     )
@@ -1691,50 +1974,63 @@ class DispenseView(LoginRequiredMixin, FormView):
             context['formset'] = self.get_form()
         
         # Add discount and payment forms as separate forms
-        discount_types = DiscountType.objects.filter(is_active=True).order_by('discount_name')
-        payment_methods = PaymentMethod.objects.filter(is_active=True).order_by('method_name')
+        discount_types = get_active_discount_types()
+        payment_methods = get_active_payment_methods()
         
         context['discount_types'] = discount_types
         context['payment_methods'] = payment_methods
         context['is_manager_or_admin'] = is_manager_or_admin(self.request.user)
         
-        # Add medicine data for JavaScript price calculation
-        # Convert Decimal to float for JSON serialization
-        import json
-        from decimal import Decimal
+        # Add medicine data for JavaScript price calculation. The serialized
+        # payload is cached briefly: signals in base.models drop it whenever
+        # a medicine or batch is saved, and the short TTL bounds staleness
+        # from the few code paths that adjust stock via queryset update().
+        medicines_json = cache.get('dispense:medicines_json')
+        if medicines_json is None:
+            medicines_json = self._build_medicines_json()
+            cache.set('dispense:medicines_json', medicines_json, 60)
+        context['medicines_json'] = medicines_json
         
-        medicines = Medicine.objects.filter(is_deleted=False).values(
-            'id', 'name', 'selling_price', 'units_per_pack', 'packs_per_box'
+        return context
+
+    def _build_medicines_json(self):
+        # One query: the batch totals are aggregated in SQL (mirroring
+        # Medicine.get_available_stock, including its treat-0-as-1 pack
+        # factors) instead of re-fetching each medicine and summing its
+        # batches per row.
+        medicines = Medicine.objects.filter(is_deleted=False).annotate(
+            available_pieces=Sum(
+                F('batches__quantity')
+                * Greatest(F('packs_per_box'), 1)
+                * Greatest(F('units_per_pack'), 1)
+                + F('batches__loose_pieces'),
+                filter=Q(batches__is_deleted=False, batches__is_recalled=False),
+            )
+        ).filter(available_pieces__gt=0).order_by('name').values(
+            'id', 'name', 'selling_price', 'units_per_pack', 'packs_per_box', 'available_pieces'
         )
-        # Restrict to medicines with available batch stock
-        medicines = Medicine.objects.filter(
-            Q(batches__quantity__gt=0) | Q(batches__loose_pieces__gt=0),
-            is_deleted=False,
-            batches__is_deleted=False,
-            batches__is_recalled=False,
-        ).distinct().values('id', 'name', 'selling_price', 'units_per_pack', 'packs_per_box')
-        
-        # Convert Decimal fields to float
+
         medicines_list = []
         for med in medicines:
-            medicine_obj = Medicine.objects.get(pk=med['id'])
-            stock_info = medicine_obj.get_available_stock()
-            
+            units_per_pack = med['units_per_pack'] or 1
+            packs_per_box = med['packs_per_box'] or 1
+            total_pieces = med['available_pieces'] or 0
+            boxes, remainder = divmod(total_pieces, units_per_pack * packs_per_box)
+            packs, pieces = divmod(remainder, units_per_pack)
+
             medicines_list.append({
                 'id': med['id'],
                 'name': med['name'],
                 'selling_price': float(med['selling_price']) if med['selling_price'] else 0,
-                'units_per_pack': med['units_per_pack'] or 1,
-                'packs_per_box': med['packs_per_box'] or 1,
-                'available_pieces': stock_info['total_pieces'],
-                'available_boxes': stock_info['boxes'],
-                'available_packs': stock_info['packs'],
-                'available_loose_pieces': stock_info['pieces']
+                'units_per_pack': units_per_pack,
+                'packs_per_box': packs_per_box,
+                'available_pieces': total_pieces,
+                'available_boxes': boxes,
+                'available_packs': packs,
+                'available_loose_pieces': pieces
             })
         
-        context['medicines_json'] = json.dumps(medicines_list)
-        
-        return context
+        return json.dumps(medicines_list)
 
     def post(self, request, *args, **kwargs):
         formset = self.get_form()
@@ -1748,8 +2044,6 @@ class DispenseView(LoginRequiredMixin, FormView):
             return self.form_invalid(formset)
 
     def form_valid(self, formset, discount_type_id, payment_method_id, cash_received):
-        from decimal import Decimal
-        from base.models import Sale, SaleLineItem, StockBatch, StockMovement, DiscountType, PaymentMethod, Ordering, OrderedProduct
         
         # Validate we have at least one item
         line_data = []
@@ -1761,20 +2055,21 @@ class DispenseView(LoginRequiredMixin, FormView):
             messages.error(self.request, "Please add at least one medicine to dispense.")
             return self.form_invalid(formset)
         
-        # Get discount and payment method
+        # Get discount and payment method from the cached active lists
+        # (unknown or inactive ids fall through to None, as before)
         discount_type = None
         if discount_type_id:
-            try:
-                discount_type = DiscountType.objects.get(pk=discount_type_id, is_active=True)
-            except DiscountType.DoesNotExist:
-                pass
+            discount_type = next(
+                (dt for dt in get_active_discount_types() if str(dt.pk) == str(discount_type_id)),
+                None
+            )
         
         payment_method = None
         if payment_method_id:
-            try:
-                payment_method = PaymentMethod.objects.get(pk=payment_method_id, is_active=True)
-            except PaymentMethod.DoesNotExist:
-                pass
+            payment_method = next(
+                (pm for pm in get_active_payment_methods() if str(pm.pk) == str(payment_method_id)),
+                None
+            )
         
         # Validate cash received
         try:
@@ -1783,134 +2078,146 @@ class DispenseView(LoginRequiredMixin, FormView):
             messages.error(self.request, "Invalid cash amount received.")
             return self.form_invalid(formset)
         
-        # Create Sale header
-        sale = Sale.objects.create(
-            user=self.request.user,
-            discount_type_fk=discount_type,
-            payment_method=payment_method,
-            status='Pending'  # Will be updated after successful dispense
-        )
-        
+
         try:
-            # Process each line item
-            before_dispense = timezone.now()
-            
-            for line in line_data:
-                medicine = line['medicine']
-                quantity = line['quantity']
-                unit_type = line['unit_type']
-                
-                # Get per-piece price
-                unit_price = medicine.selling_price or Decimal('0.00')
-                
-                # Create line item (will auto-calculate pieces_dispensed and line_total)
-                line_item = SaleLineItem.objects.create(
-                    sale=sale,
-                    medicine=medicine,
-                    quantity=quantity,
-                    unit_type=unit_type,
-                    unit_price=unit_price
-                )
-                
-                # Dispense stock via FIFO (returns leftover if insufficient stock)
-                leftover = StockBatch.dispense(
-                    medicine.id, 
-                    line_item.pieces_dispensed,  # Already converted to pieces
-                    unit_type='piece',  # Already in pieces
-                    user=self.request.user
+            # One transaction for the whole sale: any failure below raises
+            # and the database rolls everything back, instead of the old
+            # manual sale.delete() cascade that briefly left a half-built
+            # sale visible.
+            with transaction.atomic():
+                # Create Sale header
+                sale = Sale.objects.create(
+                    user=self.request.user,
+                    discount_type_fk=discount_type,
+                    payment_method=payment_method,
+                    status='Pending'  # Will be updated after successful dispense
                 )
-                
-                if leftover > 0:
-                    # Rollback: delete sale and all line items
-                    sale.delete()
-                    messages.error(
-                        self.request,
-                        f"Insufficient stock for {medicine.name}! "
-                        f"Needed {line_item.pieces_dispensed} pieces, short by {leftover} pieces."
-                    )
-                    log_activity(
-                        self.request.user,
-                        f"Failed dispense: {medicine.name}, insufficient stock."
+
+                # Build every line item up front. pieces_dispensed and
+                # line_total are computed here because bulk_create skips
+                # SaleLineItem.save().
+                pending_items = []
+                for line in line_data:
+                    medicine = line['medicine']
+                    quantity = line['quantity']
+                    unit_type = line['unit_type']
+
+                    # Get per-piece price
+                    unit_price = medicine.selling_price or Decimal('0.00')
+
+                    if unit_type == 'pack':
+                        pieces = quantity * (medicine.units_per_pack or 1)
+                    elif unit_type == 'box':
+                        pieces = quantity * (medicine.packs_per_box or 1) * (medicine.units_per_pack or 1)
+                    else:
+                        pieces = quantity
+
+                    pending_items.append(SaleLineItem(
+                        sale=sale,
+                        medicine=medicine,
+                        quantity=quantity,
+                        unit_type=unit_type,
+                        unit_price=unit_price,
+                        pieces_dispensed=pieces,
+                        line_total=Decimal(str(pieces)) * Decimal(str(unit_price))
+                    ))
+
+                # One multi-row INSERT for all lines, then one SELECT to
+                # recover the pks (MySQL can't return them from a bulk
+                # insert); default ordering is line_item_id, i.e. insert order
+                SaleLineItem.objects.bulk_create(pending_items)
+                line_items_created = list(sale.line_items.select_related('medicine'))
+
+                for line_item in line_items_created:
+                    # Dispense stock via FIFO (returns leftover if insufficient
+                    # stock, plus the pks of the movements it created)
+                    leftover, movement_ids = StockBatch.dispense(
+                        line_item.medicine_id, 
+                        line_item.pieces_dispensed,  # Already converted to pieces
+                        unit_type='piece',  # Already in pieces
+                        user=self.request.user
                     )
-                    return self.form_invalid(formset)
                 
-                # Link stock movements to this line item
-                movements = StockMovement.objects.filter(
-                    user=self.request.user,
-                    reason='sale',
-                    medicine=medicine,
-                    sale__isnull=True,
-                    line_item__isnull=True,
-                    movement_date__gte=before_dispense
-                ).order_by('movement_date')
+                    if leftover > 0:
+                        raise ValidationError(
+                            f"Insufficient stock for {line_item.medicine.name}! "
+                            f"Needed {line_item.pieces_dispensed} pieces, short by {leftover} pieces.",
+                            code='insufficient_stock',
+                            params={'medicine': line_item.medicine.name},
+                        )
                 
-                for movement in movements:
-                    movement.sale = sale
-                    movement.line_item = line_item
-                    movement.save()
+                    # Link stock movements to this line item
+                    if movement_ids:
+                        StockMovement.objects.filter(pk__in=movement_ids).update(
+                            sale=sale, line_item=line_item
+                        )
             
-            # Calculate totals with discount
-            sale.apply_discount()
+                # Calculate totals with discount
+                sale.apply_discount()
             
-            # Validate and finalize payment
-            if cash_received < sale.final_amount:
-                sale.delete()
-                messages.error(
-                    self.request,
-                    f"Cash received (₱{cash_received}) is insufficient. "
-                    f"Total amount due: ₱{sale.final_amount}"
-                )
-                return self.form_invalid(formset)
+                # Validate and finalize payment
+                if cash_received < sale.final_amount:
+                    raise ValidationError(
+                        f"Cash received (₱{cash_received}) is insufficient. "
+                        f"Total amount due: ₱{sale.final_amount}"
+                    )
             
-            sale.finalize_payment(cash_received)
-            sale.status = 'Completed'
-            sale.save(update_fields=['status'])
-
-            # Create an Ordering record to track this dispense in ORDERING/ORDERED_PRODUCT tables
-            order = Ordering.objects.create(
-                user=self.request.user,
-                customer_name=sale.customer_name or '',
-                customer_contact='',
-                status='Completed',
-                notes='Recorded from Dispense workflow',
-                sale=sale,
-                completed_date=now()
-            )
+                sale.finalize_payment(cash_received, status='Completed')
 
-            # Create corresponding OrderedProduct records
-            for line in sale.line_items.select_related('medicine').all():
-                OrderedProduct.objects.create(
-                    ordering=order,
-                    medicine=line.medicine,
-                    quantity=line.quantity,
-                    unit_type=line.unit_type,
-                    unit_price=line.unit_price
+                # Create an Ordering record to track this dispense in ORDERING/ORDERED_PRODUCT tables
+                order = Ordering.objects.create(
+                    user=self.request.user,
+                    customer_name=sale.customer_name or '',
+                    customer_contact='',
+                    status='Completed',
+                    notes='Recorded from Dispense workflow',
+                    sale=sale,
+                    completed_date=now()
                 )
-            
-            # Log activity
-            item_count = sale.line_items.count()
-            log_activity(
-                self.request.user,
-                f"Completed sale #{sale.sale_id}: {item_count} item(s), Total ₱{sale.final_amount}"
-            )
 
-            # Log order creation for audit trail
-            log_activity(
-                self.request.user,
-                f"Recorded order #{order.ordering_id} from dispense → linked to Sale #{sale.sale_id}"
-            )
+                # Create corresponding OrderedProduct records in one INSERT,
+                # from the line items already in memory (no reselect)
+                OrderedProduct.objects.bulk_create([
+                    OrderedProduct(
+                        ordering=order,
+                        medicine=line_item.medicine,
+                        quantity=line_item.quantity,
+                        unit_type=line_item.unit_type,
+                        unit_price=line_item.unit_price
+                    )
+                    for line_item in line_items_created
+                ])
             
-            messages.success(
-                self.request,
-                f"Sale completed successfully! {item_count} item(s) dispensed."
-            )
+                # Log activity
+                item_count = len(line_data)
+                log_activity(
+                    self.request.user,
+                    f"Completed sale #{sale.sale_id}: {item_count} item(s), Total ₱{sale.final_amount}"
+                )
+
+                # Log order creation for audit trail
+                log_activity(
+                    self.request.user,
+                    f"Recorded order #{order.ordering_id} from dispense → linked to Sale #{sale.sale_id}"
+                )
             
-            return redirect(reverse('view_invoice', args=[sale.sale_id]))
+                messages.success(
+                    self.request,
+                    f"Sale completed successfully! {item_count} item(s) dispensed."
+                )
             
+                return redirect(reverse('view_invoice', args=[sale.sale_id]))
+
+        except ValidationError as e:
+            # The atomic block already rolled everything back
+            messages.error(self.request, e.message)
+            if e.code == 'insufficient_stock' and e.params:
+                log_activity(
+                    self.request.user,
+                    f"Failed dispense: {e.params['medicine']}, insufficient stock."
+                )
+            return self.form_invalid(formset)
         except Exception as e:
-            # Rollback on any error
-            if sale.pk:
-                sale.delete()
             messages.error(self.request, f"Error processing sale: {str(e)}")
             return self.form_invalid(formset)
 
@@ -1965,13 +2272,13 @@ def view_invoice(request, sale_id):
     return render(request, 'sales/invoice.html', context)
 
 # --------------------------- PRODUCT TYPES ---------------------------
-from django.http import JsonResponse
 from .models import ProductType, Category
 
 def load_product_types(request):
     category_id = request.GET.get('category')
-    product_types = ProductType.objects.filter(category_id=category_id, is_deleted=False).order_by('name')
-    data = [{"id": pt.id, "name": pt.name} for pt in product_types]
+    data = list(ProductType.objects.filter(
+        category_id=category_id, is_deleted=False
+    ).order_by('name').values('id', 'name'))
     return JsonResponse(data, safe=False)
 
 # --------------------------- STOCK MOVEMENT ---------------------------
@@ -1980,12 +2287,17 @@ class StockMovementListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     template_name = "medicine/movement_list.html"
     context_object_name = "movements"
     ordering = ["-movement_date"]
+    paginate_by = 100
 
     def test_func(self):
         return is_manager_or_admin(self.request.user)
 
     def get_queryset(self):
-        queryset = super().get_queryset().select_related("medicine", "batch", "user")
+        queryset = super().get_queryset().select_related("medicine", "batch", "user").only(
+            # Only the columns the movement table renders
+            'movement_date', 'quantity', 'from_location', 'to_location',
+            'reason', 'remarks', 'medicine__name', 'batch__id', 'user__username',
+        )
         search = self.request.GET.get("search")
         if search:
             queryset = queryset.filter(medicine__name__icontains=search)
@@ -1999,7 +2311,9 @@ class StockMovementListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
 def invoice_view(request, sale_id):
     sale = get_object_or_404(Sale, pk=sale_id)
-    movements = sale.movements.select_related("medicine", "batch").all()
+    # Stream the movements in one pass; the template only uses the built
+    # items list, so nothing re-iterates the queryset
+    movements = sale.movements.select_related("medicine", "batch").iterator(chunk_size=200)
 
     items = []
     subtotal = Decimal('0.00')
@@ -2036,7 +2350,6 @@ def invoice_view(request, sale_id):
         'discount': discount_amount,
         'discount_percentage': discount_rate,
         'total': total,
-        'movements': movements,
     }
     return render(request, 'medicine/invoice.html', context)
 
@@ -2047,7 +2360,6 @@ class ManagerOrAdminRequiredMixin(UserPassesTestMixin):
         return is_manager_or_admin(self.request.user)
 
     def handle_no_permission(self):
-        from django.http import HttpResponseForbidden
         return HttpResponseForbidden("You do not have permission to view this page.")
 
 class SalesReportView(LoginRequiredMixin, ManagerOrAdminRequiredMixin, ListView):
@@ -2056,7 +2368,13 @@ class SalesReportView(LoginRequiredMixin, ManagerOrAdminRequiredMixin, ListView)
     context_object_name = "sales"
 
     def get_queryset(self):
-        queryset = Sale.objects.select_related('user').prefetch_related('movements__medicine').all().order_by("-sale_date")
+        # The report rows render each sale's movements with their medicine:
+        # prefetch them in one JOINed query instead of two
+        queryset = Sale.objects.select_related(
+            'user', 'discount_type_fk', 'payment_method'
+        ).prefetch_related(
+            Prefetch('movements', queryset=StockMovement.objects.select_related('medicine'))
+        ).order_by("-sale_date")
         
         # Date range filter
         start_date = self.request.GET.get("start_date")
@@ -2076,22 +2394,29 @@ class SalesReportView(LoginRequiredMixin, ManagerOrAdminRequiredMixin, ListView)
         user = self.request.user
         context["is_manager_or_admin"] = is_manager_or_admin(user)
         
-        sales = context["sales"]
-        
-        # Calculate totals
-        total_sales = sum(s.total_amount for s in sales)  # Before discount
-        total_discounts = sum(s.discount_amount for s in sales)
-        net_sales = sum(s.final_amount for s in sales)  # After discount
+        # Calculate totals in one SQL aggregate over the filtered set
+        # instead of materializing every sale to sum three Decimals. The
+        # template renders the rows anyway, so forcing evaluation here is
+        # free — and an empty page can skip the aggregate round-trip
+        # entirely (common with narrow date filters).
+        if self.object_list:
+            totals = self.object_list.aggregate(
+                total_sales=Sum('total_amount'),
+                total_discounts=Sum('discount_amount'),
+                net_sales=Sum('final_amount'),
+            )
+        else:
+            totals = {'total_sales': 0, 'total_discounts': 0, 'net_sales': 0}
         
-        context["total_sales"] = total_sales
-        context["total_discounts"] = total_discounts
-        context["net_sales"] = net_sales
+        context["total_sales"] = totals['total_sales'] or 0
+        context["total_discounts"] = totals['total_discounts'] or 0
+        context["net_sales"] = totals['net_sales'] or 0
         context["start_date"] = self.request.GET.get("start_date", "")
         context["end_date"] = self.request.GET.get("end_date", "")
         context["medicine_id"] = self.request.GET.get("medicine", "")
         
-        # Get all medicines for the filter dropdown
-        context["medicines"] = Medicine.objects.filter(is_deleted=False).order_by('name')
+        # Get all medicines for the filter dropdown (cached)
+        context["medicines"] = get_medicine_filter_choices()
         
         return context
 
@@ -2107,20 +2432,28 @@ def process_expired_stock_view(request):
 
 # --------------------------- ADDED: STOCK TRANSFER (STOCK OUT VIA TRANSFER) WORKFLOW ---------------------------
 class TransferItemForm(forms.Form):
-    # Only show medicines that have available stock in batches
-    def __init__(self, *args, **kwargs):
+    # Only show medicines that have available stock in batches. The view
+    # passes one evaluated queryset via form_kwargs so a multi-row formset
+    # shares it instead of re-running the stock lookup per form.
+    def __init__(self, *args, medicine_qs=None, **kwargs):
         super().__init__(*args, **kwargs)
-        # Get medicines with available stock
-        from django.db.models import Sum, Q
-        medicines_with_stock = StockBatch.objects.filter(
-            is_deleted=False,
-            is_recalled=False,
-            quantity__gt=0
-        ).values_list('medicine_id', flat=True).distinct()
-        
-        self.fields['medicine'].queryset = Medicine.objects.filter(
-            id__in=medicines_with_stock
-        ).order_by('name')
+        if medicine_qs is None:
+            medicines_with_stock = StockBatch.objects.filter(
+                is_deleted=False,
+                is_recalled=False,
+                quantity__gt=0
+            ).values_list('medicine_id', flat=True).distinct()
+            medicine_qs = Medicine.objects.filter(
+                id__in=medicines_with_stock
+            ).order_by('name')
+        else:
+            # Already evaluated in the view: build the <select> choices
+            # from the cached rows so rendering each row costs no SQL
+            self.fields['medicine'].choices = (
+                [('', self.fields['medicine'].empty_label)]
+                + [(med.pk, str(med)) for med in medicine_qs]
+            )
+        self.fields['medicine'].queryset = medicine_qs
     
     medicine = forms.ModelChoiceField(queryset=Medicine.objects.none(), empty_label="-- Select medicine --")
     quantity = forms.IntegerField(
@@ -2147,18 +2480,32 @@ def _pieces_from_unit(medicine, qty, unit_type):
 
 @transaction.atomic
 def fifo_transfer(medicine_id, pieces_needed, user, destination=""):
+    """Transfer stock out via FIFO, batching the writes: emptied batches are
+    soft-deleted with one UPDATE, the partial batch with one bulk_update,
+    and all movement rows with one bulk_create — instead of two round-trips
+    per batch consumed."""
     created_movements = []
     try:
         medicine = Medicine.objects.get(pk=medicine_id)
     except Medicine.DoesNotExist:
         return pieces_needed, created_movements
 
-    batches = StockBatch.objects.filter(
+    # Row-lock the batches for the duration of the transaction so
+    # concurrent transfers cannot double-consume the same stock. SKIP
+    # LOCKED (MySQL 8+) lets parallel callers take disjoint batches
+    # instead of queueing; backends without it just block.
+    locked = StockBatch.objects.select_for_update(
+        skip_locked=connection.features.has_select_for_update_skip_locked
+    )
+    batches = locked.filter(
         medicine_id=medicine_id,
         is_deleted=False,
         is_recalled=False
     ).select_related("medicine").order_by("date_received")
 
+    emptied_ids = []
+    partial_batches = []
+
     for batch in batches:
         if pieces_needed <= 0:
             break
@@ -2166,21 +2513,17 @@ def fifo_transfer(medicine_id, pieces_needed, user, destination=""):
         if batch_total_pieces <= pieces_needed:
             consumed = batch_total_pieces
             pieces_needed -= consumed
-            try:
-                mv = StockMovement.objects.create(
-                    medicine=batch.medicine,
-                    batch=batch,
-                    from_location=batch.location,
-                    to_location=destination,
-                    quantity=consumed,
-                    reason="transfer",
-                    remarks=f"Stock transfer out (full batch) via FIFO to {destination}" if destination else "Stock transfer out (full batch) via FIFO",
-                    user=user
-                )
-                created_movements.append(mv)
-            except Exception:
-                pass
-            batch.delete()
+            created_movements.append(StockMovement(
+                medicine=batch.medicine,
+                batch=batch,
+                from_location=batch.location,
+                to_location=destination,
+                quantity=consumed,
+                reason="transfer",
+                remarks=f"Stock transfer out (full batch) via FIFO to {destination}" if destination else "Stock transfer out (full batch) via FIFO",
+                user=user
+            ))
+            emptied_ids.append(batch.pk)
         else:
             consumed = pieces_needed
             remaining_pieces = batch_total_pieces - consumed
@@ -2188,66 +2531,124 @@ def fifo_transfer(medicine_id, pieces_needed, user, destination=""):
             packs_per_box = batch.medicine.packs_per_box or 1
             pieces_per_box = units_per_pack * packs_per_box
             batch.quantity = remaining_pieces // pieces_per_box
-            batch.save()
-            try:
-                mv = StockMovement.objects.create(
-                    medicine=batch.medicine,
-                    batch=batch,
-                    from_location=batch.location,
-                    to_location=destination,
-                    quantity=consumed,
-                    reason="transfer",
-                    remarks=f"Stock transfer out (partial batch) via FIFO to {destination}" if destination else "Stock transfer out (partial batch) via FIFO",
-                    user=user
-                )
-                created_movements.append(mv)
-            except Exception:
-                pass
+            partial_batches.append(batch)
+            created_movements.append(StockMovement(
+                medicine=batch.medicine,
+                batch=batch,
+                from_location=batch.location,
+                to_location=destination,
+                quantity=consumed,
+                reason="transfer",
+                remarks=f"Stock transfer out (partial batch) via FIFO to {destination}" if destination else "Stock transfer out (partial batch) via FIFO",
+                user=user
+            ))
             pieces_needed = 0
 
+    with transaction.atomic():
+        if emptied_ids:
+            # Same effect as the soft-delete each batch.delete() performed
+            StockBatch.objects.filter(pk__in=emptied_ids).update(is_deleted=True)
+        if partial_batches:
+            StockBatch.objects.bulk_update(partial_batches, ['quantity'])
+        if created_movements:
+            if connection.features.can_return_rows_from_bulk_insert:
+                StockMovement.objects.bulk_create(created_movements, batch_size=500)
+            else:
+                # MySQL can't return ids from a multi-row INSERT, but the
+                # confirmation page renders each movement's id — re-select
+                # our rows inside the same transaction to get real pks.
+                pre_max = StockMovement.objects.aggregate(m=Max('pk'))['m'] or 0
+                StockMovement.objects.bulk_create(created_movements, batch_size=500)
+                created_movements = list(StockMovement.objects.filter(
+                    pk__gt=pre_max, medicine_id=medicine_id, reason='transfer'
+                ).order_by('pk'))
+
     return pieces_needed, created_movements
 
+def _transferable_medicines():
+    """Evaluated queryset of medicines with transferable batch stock,
+    shared across every row of the transfer formset."""
+    queryset = Medicine.objects.filter(
+        id__in=StockBatch.objects.filter(
+            is_deleted=False,
+            is_recalled=False,
+            quantity__gt=0
+        ).values_list('medicine_id', flat=True).distinct()
+    ).order_by('name')
+    list(queryset)  # force one evaluation; forms reuse the result cache
+    return queryset
+
+
+def _transfer_stock_etag(request, *args, **kwargs):
+    """ETag for the transfer page: changes whenever stock moves, a new
+    batch is received, or a batch is edited through a form save, so
+    unchanged pages can answer 304 without rebuilding the medicine list.
+
+    Quantity edits and soft-deletes don't create movement rows or new
+    batch pks, so the key also folds in a version stamp that every
+    StockBatch save/delete signal clears; regenerating it on a miss can
+    only force a re-render, never a stale 304."""
+    latest_movement = StockMovement.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    latest_batch = StockBatch.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    version = cache.get('transfer_stock_ver')
+    if version is None:
+        version = timezone.now().timestamp()
+        cache.set('transfer_stock_ver', version, None)
+    return f'"transfer-{latest_movement}-{latest_batch}-{version}"'
+
+
 class TransferView(LoginRequiredMixin, UserPassesTestMixin, View):
     def test_func(self):
         return is_manager_or_admin(self.request.user)
     
     def handle_no_permission(self):
-        from django.shortcuts import render
         context = {
             'user_role': get_user_role_display(self.request.user),
             'is_manager_or_admin': False
         }
         return render(self.request, 'shared/access_denied.html', context, status=403)
 
+    @method_decorator(etag(_transfer_stock_etag))
     def get(self, request, *args, **kwargs):
-        import json
         TransferFormSet = formset_factory(TransferItemForm, extra=4)
-        formset = TransferFormSet()
+        formset = TransferFormSet(form_kwargs={'medicine_qs': _transferable_medicines()})
         
-        # Get all medicines with available stock and their detailed info
-        medicines_with_stock = StockBatch.objects.filter(
-            is_deleted=False,
-            is_recalled=False,
-            quantity__gt=0
-        ).values_list('medicine_id', flat=True).distinct()
+        # All medicines with available stock plus their totals in one
+        # annotated query; box/pack/loose equivalents via divmod in Python
+        medicines_with_stock = (Medicine.objects
+            .filter(
+                is_deleted=False,
+                batches__is_deleted=False,
+                batches__is_recalled=False,
+            )
+            .filter(Q(batches__quantity__gt=0) | Q(batches__loose_pieces__gt=0))
+            .annotate(
+                available_pieces=Sum(
+                    F('batches__quantity')
+                    * Greatest(F('packs_per_box'), 1)
+                    * Greatest(F('units_per_pack'), 1)
+                    + F('batches__loose_pieces')
+                )
+            )
+            .values('id', 'name', 'units_per_pack', 'packs_per_box', 'available_pieces')
+        )
         
         medicines_data = []
-        for med_id in medicines_with_stock:
-            try:
-                medicine = Medicine.objects.get(pk=med_id)
-                stock_info = medicine.get_available_stock()
-                medicines_data.append({
-                    'id': med_id,
-                    'name': medicine.name,
-                    'available_pieces': stock_info['total_pieces'],
-                    'available_boxes': stock_info['boxes'],
-                    'available_packs': stock_info['packs'],
-                    'available_loose_pieces': stock_info['pieces'],
-                    'units_per_pack': stock_info['units_per_pack'],
-                    'packs_per_box': stock_info['packs_per_box']
-                })
-            except Medicine.DoesNotExist:
-                pass
+        for med in medicines_with_stock:
+            units_per_pack = med['units_per_pack'] or 1
+            packs_per_box = med['packs_per_box'] or 1
+            boxes, rem = divmod(med['available_pieces'] or 0, packs_per_box * units_per_pack)
+            packs, loose = divmod(rem, units_per_pack)
+            medicines_data.append({
+                'id': med['id'],
+                'name': med['name'],
+                'available_pieces': med['available_pieces'] or 0,
+                'available_boxes': boxes,
+                'available_packs': packs,
+                'available_loose_pieces': loose,
+                'units_per_pack': units_per_pack,
+                'packs_per_box': packs_per_box,
+            })
         
         return render(request, "transfer/transfer_form.html", {
             "formset": formset,
@@ -2258,7 +2659,7 @@ class TransferView(LoginRequiredMixin, UserPassesTestMixin, View):
 
     def post(self, request, *args, **kwargs):
         TransferFormSet = formset_factory(TransferItemForm)
-        formset = TransferFormSet(request.POST)
+        formset = TransferFormSet(request.POST, form_kwargs={'medicine_qs': _transferable_medicines()})
         if not formset.is_valid():
             messages.error(request, "Please correct the errors below.")
             return render(request, "transfer/transfer_form.html", {"formset": formset})
@@ -2312,6 +2713,23 @@ class TransferView(LoginRequiredMixin, UserPassesTestMixin, View):
         })
 
 # --------------------------- PRICE HISTORY VIEW ---------------------------
+class PriceHistoryCountPaginator(Paginator):
+    """Paginator that serves the expensive COUNT(*) from the cache.
+
+    Used for unfiltered history listings where an up-to-five-minutes-stale
+    total is acceptable; filtered views keep the exact count.
+    """
+
+    cache_key = None
+    timeout = 300
+
+    @cached_property
+    def count(self):
+        if not self.cache_key:
+            return super().count
+        return cache.get_or_set(self.cache_key, lambda: super(PriceHistoryCountPaginator, self).count, self.timeout)
+
+
 class PriceHistoryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     model = None  # Will be set dynamically
     template_name = "medicine/price_history.html"
@@ -2322,7 +2740,6 @@ class PriceHistoryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return is_manager_or_admin(self.request.user)
 
     def get_queryset(self):
-        from base.models import PriceHistory
         queryset = PriceHistory.objects.select_related('medicine', 'changed_by').all()
         
         # Filter by medicine
@@ -2345,13 +2762,28 @@ class PriceHistoryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         
         return queryset.order_by('-change_date')
     
+    def get_paginator(self, queryset, per_page, **kwargs):
+        # The paginator COUNT(*) scans PriceHistory on every page load.
+        # For the common unfiltered view a briefly cached total is fine;
+        # any filter falls back to the exact count.
+        filtered = any(
+            self.request.GET.get(param)
+            for param in ('medicine', 'user', 'start_date', 'end_date')
+        )
+        paginator = PriceHistoryCountPaginator(queryset, per_page, **kwargs)
+        if not filtered:
+            paginator.cache_key = 'pricehistory_total_count'
+        return paginator
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         context["is_manager_or_admin"] = is_manager_or_admin(user)
         
-        context['medicines'] = Medicine.objects.all().order_by('name')
-        context['users'] = User.objects.filter(is_active=True).order_by('username')
+        # Dropdowns only need id + label; values() keeps the template's
+        # med.id / u.username lookups working without model instantiation
+        context['medicines'] = Medicine.objects.order_by('name').values('id', 'name')
+        context['users'] = User.objects.filter(is_active=True).order_by('username').values('id', 'username')
         context['selected_medicine'] = self.request.GET.get('medicine', '')
         context['selected_user'] = self.request.GET.get('user', '')
         context['start_date'] = self.request.GET.get('start_date', '')
@@ -2365,8 +2797,9 @@ class ActualInventoryView(LoginRequiredMixin, ListView):
     context_object_name = "inventory_items"
 
     def get_queryset(self):
-        # Only show batches in "front" (Store Shelf) location
-        from django.db.models import Q
+        # Only show batches in "front" (Store Shelf) location. pieces_total
+        # mirrors the total_pieces property in SQL so both the status
+        # filter and the summary stats can run database-side.
         queryset = (StockBatch.objects
             .filter(
                 location='front',
@@ -2375,6 +2808,17 @@ class ActualInventoryView(LoginRequiredMixin, ListView):
             )
             .filter(Q(quantity__gt=0) | Q(loose_pieces__gt=0))
             .select_related('medicine')
+            .only(
+                'quantity', 'loose_pieces', 'expiry_date',
+                'medicine__name', 'medicine__brand', 'medicine__selling_price',
+                'medicine__units_per_pack', 'medicine__packs_per_box',
+            )
+            .annotate(
+                pieces_total=F('quantity')
+                * Greatest(F('medicine__packs_per_box'), 1)
+                * Greatest(F('medicine__units_per_pack'), 1)
+                + F('loose_pieces')
+            )
             .order_by('medicine__name', 'date_received')
         )
         
@@ -2383,10 +2827,18 @@ class ActualInventoryView(LoginRequiredMixin, ListView):
         if search:
             queryset = queryset.filter(medicine__name__icontains=search)
         
+        # Status filter runs in SQL so filtered pages never fetch the rest
+        status_filter = self.request.GET.get('status', 'all')
+        if status_filter == 'low':
+            queryset = queryset.filter(pieces_total__lt=50)
+        elif status_filter == 'medium':
+            queryset = queryset.filter(pieces_total__gte=50, pieces_total__lt=200)
+        elif status_filter == 'good':
+            queryset = queryset.filter(pieces_total__gte=200)
+        
         return queryset
     
     def get_context_data(self, **kwargs):
-        from datetime import date, timedelta
         
         context = super().get_context_data(**kwargs)
         user = self.request.user
@@ -2398,48 +2850,38 @@ class ActualInventoryView(LoginRequiredMixin, ListView):
         context['today'] = today
         context['six_months_from_now'] = six_months_from_now
         
-        # Get status filter
-        status_filter = self.request.GET.get('status', 'all')
-        context['status_filter'] = status_filter
-        
-        # Calculate totals and filter by status
-        all_batches = context['inventory_items']
-        total_value = Decimal('0.00')
-        total_items = 0
-        low_stock_count = 0
-        medium_stock_count = 0
-        in_stock_count = 0
-        
-        # Filter batches by status if needed
-        filtered_batches = []
-        for batch in all_batches:
-            total_pieces = batch.total_pieces
-            value = total_pieces * (batch.medicine.selling_price or 0)
-            total_value += value
-            total_items += total_pieces
-            
-            # Determine status
-            if total_pieces < 50:
-                batch_status = 'low'
-                low_stock_count += 1
-            elif total_pieces < 200:
-                batch_status = 'medium'
-                medium_stock_count += 1
-            else:
-                batch_status = 'good'
-                in_stock_count += 1
-            
-            # Apply filter
-            if status_filter == 'all' or status_filter == batch_status:
-                filtered_batches.append(batch)
+        context['status_filter'] = self.request.GET.get('status', 'all')
+        
+        # Summary stats cover every front batch matching the search,
+        # regardless of the status filter — one aggregate round-trip
+        base = StockBatch.objects.filter(
+            location='front',
+            is_deleted=False,
+            is_recalled=False,
+        ).filter(Q(quantity__gt=0) | Q(loose_pieces__gt=0)).annotate(
+            pieces_total=F('quantity')
+            * Greatest(F('medicine__packs_per_box'), 1)
+            * Greatest(F('medicine__units_per_pack'), 1)
+            + F('loose_pieces')
+        )
+        search = self.request.GET.get('search')
+        if search:
+            base = base.filter(medicine__name__icontains=search)
+        
+        stats = base.aggregate(
+            total_value=Sum(F('pieces_total') * F('medicine__selling_price')),
+            total_items=Sum('pieces_total'),
+            low=Count('pk', filter=Q(pieces_total__lt=50)),
+            medium=Count('pk', filter=Q(pieces_total__gte=50, pieces_total__lt=200)),
+            good=Count('pk', filter=Q(pieces_total__gte=200)),
+        )
         
-        context['inventory_items'] = filtered_batches
-        context['total_value'] = total_value
-        context['total_items'] = total_items
+        context['total_value'] = stats['total_value'] or Decimal('0.00')
+        context['total_items'] = stats['total_items'] or 0
         context['search'] = self.request.GET.get('search', '')
-        context['low_stock_count'] = low_stock_count
-        context['medium_stock_count'] = medium_stock_count
-        context['in_stock_count'] = in_stock_count
+        context['low_stock_count'] = stats['low']
+        context['medium_stock_count'] = stats['medium']
+        context['in_stock_count'] = stats['good']
         
         return context
 
@@ -2450,10 +2892,8 @@ class ExpirationMonitorView(LoginRequiredMixin, ListView):
     context_object_name = "batches"
 
     def get_queryset(self):
-        from datetime import date, timedelta
         
         today = date.today()
-        from django.db.models import Q
         queryset = (StockBatch.objects
             .filter(
                 is_deleted=False,
@@ -2461,6 +2901,11 @@ class ExpirationMonitorView(LoginRequiredMixin, ListView):
             )
             .filter(Q(quantity__gt=0) | Q(loose_pieces__gt=0))
             .select_related('medicine')
+            .only(
+                'quantity', 'loose_pieces', 'expiry_date', 'date_received',
+                'location', 'medicine__name', 'medicine__brand',
+                'medicine__units_per_pack', 'medicine__packs_per_box',
+            )
             .order_by('expiry_date')
         )
         
@@ -2474,10 +2919,11 @@ class ExpirationMonitorView(LoginRequiredMixin, ListView):
             end_date = today + timedelta(days=180)
             queryset = queryset.filter(expiry_date__gte=today, expiry_date__lte=end_date)
         
-        return queryset
+        # Unpaginated page, template walks the rows exactly once: stream
+        # them in chunks instead of caching the whole result set
+        return queryset.iterator(chunk_size=2000)
     
     def get_context_data(self, **kwargs):
-        from datetime import date, timedelta
         
         context = super().get_context_data(**kwargs)
         user = self.request.user
@@ -2486,14 +2932,18 @@ class ExpirationMonitorView(LoginRequiredMixin, ListView):
         today = date.today()
         six_months_from_now = today + timedelta(days=180)
         
-        # Count statistics - 6 months window
-        from django.db.models import Q
-        all_batches = StockBatch.objects.filter(is_deleted=False, is_recalled=False).filter(Q(quantity__gt=0) | Q(loose_pieces__gt=0))
-        context['expired_count'] = all_batches.filter(expiry_date__lt=today).count()
-        context['expiring_6months_count'] = all_batches.filter(
-            expiry_date__gte=today, 
-            expiry_date__lte=six_months_from_now
-        ).count()
+        # Count statistics - 6 months window, both counts in one round-trip
+        stats = StockBatch.objects.filter(
+            is_deleted=False, is_recalled=False,
+        ).filter(Q(quantity__gt=0) | Q(loose_pieces__gt=0)).aggregate(
+            expired=Count('pk', filter=Q(expiry_date__lt=today)),
+            expiring_soon=Count('pk', filter=Q(
+                expiry_date__gte=today,
+                expiry_date__lte=six_months_from_now,
+            )),
+        )
+        context['expired_count'] = stats['expired']
+        context['expiring_6months_count'] = stats['expiring_soon']
         
         context['filter'] = self.request.GET.get('filter', 'all')
         context['today'] = today
@@ -2506,6 +2956,26 @@ class ExpirationMonitorView(LoginRequiredMixin, ListView):
 # ORDERING VIEWS - Customer Order Management
 # ========================================
 
+def get_available_pieces_map(medicine_ids):
+    """Total live, unexpired pieces per medicine id, in one aggregate query.
+
+    Shared by the ordering views that need to check stock for a set of
+    line items without querying batches per item.
+    """
+    today = date.today()
+    rows = Medicine.objects.filter(id__in=medicine_ids).annotate(
+        total_pieces=Sum(
+            F('batches__quantity')
+            * Greatest(F('packs_per_box'), 1)
+            * Greatest(F('units_per_pack'), 1)
+            + F('batches__loose_pieces'),
+            filter=Q(batches__is_deleted=False, batches__is_recalled=False)
+            & (Q(batches__expiry_date__isnull=True) | Q(batches__expiry_date__gte=today)),
+        )
+    ).values_list('id', 'total_pieces')
+    return {med_id: total or 0 for med_id, total in rows}
+
+
 class OrderingListView(LoginRequiredMixin, ListView):
     """List all customer orders with filtering by status"""
     model = Ordering
@@ -2514,9 +2984,18 @@ class OrderingListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
+        # The list only renders order headers plus get_total_amount, which
+        # sums ordered_products line_total — prefetch just those columns
+        # (the old 'ordered_products__medicine' pulled a whole extra table
+        # the template never touches)
         queryset = Ordering.objects.select_related(
             'user', 'confirmed_by', 'sale'
-        ).prefetch_related('ordered_products__medicine')
+        ).prefetch_related(
+            Prefetch(
+                'ordered_products',
+                queryset=OrderedProduct.objects.only('ordering_id', 'line_total'),
+            )
+        )
         
         # Filter by status if provided
         status_filter = self.request.GET.get('status', '')
@@ -2539,10 +3018,15 @@ class OrderingListView(LoginRequiredMixin, ListView):
         context['search_query'] = self.request.GET.get('search', '')
         context['status_choices'] = Ordering.STATUS_CHOICES
         
-        # Count by status
-        context['pending_count'] = Ordering.objects.filter(status='Pending').count()
-        context['confirmed_count'] = Ordering.objects.filter(status='Confirmed').count()
-        context['ready_count'] = Ordering.objects.filter(status='Ready').count()
+        # Count by status — one aggregate round-trip instead of three COUNTs
+        counts = Ordering.objects.aggregate(
+            pending=Count('pk', filter=Q(status='Pending')),
+            confirmed=Count('pk', filter=Q(status='Confirmed')),
+            ready=Count('pk', filter=Q(status='Ready')),
+        )
+        context['pending_count'] = counts['pending']
+        context['confirmed_count'] = counts['confirmed']
+        context['ready_count'] = counts['ready']
         
         return context
 
@@ -2557,32 +3041,37 @@ class OrderingCreateView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get all active medicines with stock
-        medicines = Medicine.objects.filter(
-            is_deleted=False
-        ).select_related('category', 'product_type')
-        
-        # Add stock info for each medicine
-        medicine_data = []
-        for med in medicines:
-            total_pieces = sum(
-                batch.available_pieces 
-                for batch in med.stockbatch_set.filter(
-                    is_deleted=False,
-                    is_recalled=False,
-                    is_expired=False
-                )
+        # Get all active medicines with stock. One aggregated query: the
+        # piece totals are summed in SQL across each medicine's live,
+        # unexpired batches (same pack-factor arithmetic as the dispense
+        # page) instead of one batch query per medicine.
+        today = date.today()
+        medicines = Medicine.objects.filter(is_deleted=False).annotate(
+            total_pieces=Sum(
+                F('batches__quantity')
+                * Greatest(F('packs_per_box'), 1)
+                * Greatest(F('units_per_pack'), 1)
+                + F('batches__loose_pieces'),
+                filter=Q(batches__is_deleted=False, batches__is_recalled=False)
+                & (Q(batches__expiry_date__isnull=True) | Q(batches__expiry_date__gte=today)),
             )
-            if total_pieces > 0:
-                medicine_data.append({
-                    'id': med.medicine_id,
-                    'name': med.name,
-                    'category': med.category.category_name if med.category else '',
-                    'price': float(med.price),
-                    'available_pieces': total_pieces,
-                    'units_per_pack': med.units_per_pack or 1,
-                    'packs_per_box': med.packs_per_box or 1,
-                })
+        ).filter(total_pieces__gt=0).order_by('name').values(
+            'id', 'name', 'category__name', 'selling_price', 'total_pieces',
+            'units_per_pack', 'packs_per_box'
+        )
+        
+        medicine_data = [
+            {
+                'id': med['id'],
+                'name': med['name'],
+                'category': med['category__name'] or '',
+                'price': float(med['selling_price'] or 0),
+                'available_pieces': med['total_pieces'],
+                'units_per_pack': med['units_per_pack'] or 1,
+                'packs_per_box': med['packs_per_box'] or 1,
+            }
+            for med in medicines
+        ]
         
         context['medicines'] = medicine_data
         return context
@@ -2599,18 +3088,34 @@ class OrderingCreateView(LoginRequiredMixin, CreateView):
         quantities = self.request.POST.getlist('quantity[]')
         unit_types = self.request.POST.getlist('unit_type[]')
         
-        from decimal import Decimal
-        
+        # One lookup for all medicines, then one INSERT for all lines.
+        # bulk_create skips OrderedProduct.save(), so pieces_needed and
+        # line_total are precomputed here with the same arithmetic.
+        med_map = Medicine.objects.in_bulk(
+            [med_id for med_id in medicines if med_id]
+        )
+        pending_items = []
         for med_id, qty, unit in zip(medicines, quantities, unit_types):
             if med_id and qty:
-                medicine = Medicine.objects.get(medicine_id=med_id)
-                OrderedProduct.objects.create(
+                medicine = med_map[int(med_id)]
+                qty = int(qty)
+                if unit == 'pack':
+                    pieces = qty * (medicine.units_per_pack or 1)
+                elif unit == 'box':
+                    pieces = qty * (medicine.packs_per_box or 1) * (medicine.units_per_pack or 1)
+                else:
+                    pieces = qty
+                unit_price = Decimal(str(medicine.selling_price))
+                pending_items.append(OrderedProduct(
                     ordering=self.object,
                     medicine=medicine,
-                    quantity=int(qty),
+                    quantity=qty,
                     unit_type=unit,
-                    unit_price=Decimal(str(medicine.price))
-                )
+                    unit_price=unit_price,
+                    pieces_needed=pieces,
+                    line_total=Decimal(str(pieces)) * unit_price,
+                ))
+        OrderedProduct.objects.bulk_create(pending_items)
         
         messages.success(self.request, f"Order #{self.object.ordering_id} created successfully!")
         log_activity(self.request.user, f"Created customer order #{self.object.ordering_id} for {self.object.customer_name}")
@@ -2634,17 +3139,12 @@ class OrderingDetailView(LoginRequiredMixin, DetailView):
         context['items'] = items
         context['total_amount'] = order.get_total_amount()
         
-        # Check stock availability for each item
+        # Check stock availability for each item — one aggregate query for
+        # the whole order instead of one batch scan per item
+        avail_map = get_available_pieces_map({item.medicine_id for item in items})
         availability = []
         for item in items:
-            available = sum(
-                batch.available_pieces 
-                for batch in item.medicine.stockbatch_set.filter(
-                    is_deleted=False,
-                    is_recalled=False,
-                    is_expired=False
-                )
-            )
+            available = avail_map.get(item.medicine_id, 0)
             availability.append({
                 'item': item,
                 'available': available,
@@ -2665,17 +3165,12 @@ class OrderingConfirmView(LoginRequiredMixin, View):
             messages.error(request, "Only pending orders can be confirmed.")
             return redirect('ordering-detail', ordering_id=ordering_id)
         
-        # Check stock availability
+        # Check stock availability — single aggregate for all line items
+        items = list(order.ordered_products.select_related('medicine'))
+        avail_map = get_available_pieces_map({item.medicine_id for item in items})
         insufficient = []
-        for item in order.ordered_products.all():
-            available = sum(
-                batch.available_pieces 
-                for batch in item.medicine.stockbatch_set.filter(
-                    is_deleted=False,
-                    is_recalled=False,
-                    is_expired=False
-                )
-            )
+        for item in items:
+            available = avail_map.get(item.medicine_id, 0)
             if available < item.pieces_needed:
                 insufficient.append(f"{item.medicine.name} (need {item.pieces_needed}, have {available})")
         
@@ -2747,79 +3242,82 @@ class OrderingFulfillView(LoginRequiredMixin, FormView):
             messages.error(request, "Only ready orders can be fulfilled.")
             return redirect('ordering-detail', ordering_id=ordering_id)
         
-        from decimal import Decimal
         
         # Get payment details
         discount_type_id = request.POST.get('discount_type')
         payment_method_id = request.POST.get('payment_method')
         cash_received = request.POST.get('cash_received', '0')
         
-        # Create sale
-        sale = Sale.objects.create(
-            user=request.user,
-            customer_name=order.customer_name,
-            discount_type_fk_id=discount_type_id if discount_type_id else None,
-            payment_method_id=payment_method_id if payment_method_id else None,
-            status='Completed'
-        )
-        
-        # Create sale line items and dispense stock
-        for item in order.ordered_products.all():
-            # Dispense stock using FIFO
-            pieces_to_dispense = item.pieces_needed
-            batches = item.medicine.stockbatch_set.filter(
-                is_deleted=False,
-                is_recalled=False,
-                is_expired=False,
-                available_pieces__gt=0
-            ).order_by('expiry_date')
-            
-            for batch in batches:
-                if pieces_to_dispense <= 0:
-                    break
-                
-                dispense_qty = min(pieces_to_dispense, batch.available_pieces)
-                
-                # Create stock movement
-                movement = StockMovement.objects.create(
-                    batch=batch,
-                    movement_type='Sale',
-                    quantity=dispense_qty,
+        # Create the sale, its line items and the stock movements in one
+        # transaction, reusing the FIFO machinery from the dispense flow;
+        # any failure rolls the whole fulfillment back
+        try:
+            with transaction.atomic():
+                sale = Sale.objects.create(
                     user=request.user,
-                    reference_number=f"ORDER-{ordering_id}"
+                    customer_name=order.customer_name,
+                    discount_type_fk_id=discount_type_id if discount_type_id else None,
+                    payment_method_id=payment_method_id if payment_method_id else None,
+                    status='Pending'
                 )
                 
-                # Update batch stock
-                batch.available_pieces -= dispense_qty
-                batch.save(update_fields=['available_pieces'])
+                items = list(order.ordered_products.select_related('medicine'))
                 
-                pieces_to_dispense -= dispense_qty
-            
-            # Create sale line item
-            SaleLineItem.objects.create(
-                sale=sale,
-                medicine=item.medicine,
-                quantity=item.quantity,
-                unit_type=item.unit_type,
-                unit_price=item.unit_price,
-                line_total=item.line_total,
-                pieces_dispensed=item.pieces_needed
-            )
-        
-        # Apply discount and finalize payment
-        sale.apply_discount()
-        sale.finalize_payment(Decimal(cash_received))
-        
-        # Link sale to order
-        order.sale = sale
-        order.status = 'Completed'
-        order.completed_date = now()
-        order.save(update_fields=['sale', 'status', 'completed_date'])
+                # One multi-row INSERT for all lines, then one SELECT to
+                # recover the pks (MySQL can't return them from a bulk insert)
+                SaleLineItem.objects.bulk_create([
+                    SaleLineItem(
+                        sale=sale,
+                        medicine=item.medicine,
+                        quantity=item.quantity,
+                        unit_type=item.unit_type,
+                        unit_price=item.unit_price,
+                        line_total=item.line_total,
+                        pieces_dispensed=item.pieces_needed
+                    )
+                    for item in items
+                ])
+                line_items = list(sale.line_items.select_related('medicine'))
+                
+                for line_item in line_items:
+                    # Dispense stock via FIFO (returns leftover plus the pks
+                    # of the movements it created)
+                    leftover, movement_ids = StockBatch.dispense(
+                        line_item.medicine_id,
+                        line_item.pieces_dispensed,
+                        unit_type='piece',
+                        user=request.user
+                    )
+                    
+                    if leftover > 0:
+                        raise ValidationError(
+                            f"Insufficient stock for {line_item.medicine.name}: "
+                            f"short by {leftover} pieces."
+                        )
+                    
+                    # Link stock movements to this line item
+                    if movement_ids:
+                        StockMovement.objects.filter(pk__in=movement_ids).update(
+                            sale=sale, line_item=line_item
+                        )
+                
+                # Apply discount and finalize payment
+                sale.apply_discount()
+                sale.finalize_payment(Decimal(cash_received), status='Completed')
+                
+                # Link sale to order
+                order.sale = sale
+                order.status = 'Completed'
+                order.completed_date = now()
+                order.save(update_fields=['sale', 'status', 'completed_date'])
+        except ValidationError as e:
+            messages.error(request, e.message)
+            return redirect('ordering-detail', ordering_id=ordering_id)
         
         messages.success(request, f"Order #{ordering_id} fulfilled! Invoice: {sale.invoice_number}")
         log_activity(request.user, f"Fulfilled customer order #{ordering_id} -> Sale #{sale.sale_id}")
         
-        return redirect('invoice', pk=sale.sale_id)
+        return redirect('view_invoice', sale_id=sale.sale_id)
 
 
 # ========================================
@@ -2839,21 +3337,67 @@ class PurchaseOrderForm(forms.ModelForm):
     )
     
     class Meta:
-        from base.models import PurchaseOrder
         model = PurchaseOrder
         fields = ['supplier', 'po_date', 'expected_delivery_date', 'status', 'notes']
         widgets = {
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
+def _po_lines_prefetch():
+    """Prefetch for PO line rows narrowed to what the list templates
+    render (incl. unit_cost for line_total)."""
+    return Prefetch('lines', queryset=PurchaseOrderLine.objects.select_related('medicine').only(
+        'purchase_order_id', 'quantity_ordered', 'unit', 'unit_cost',
+        'manufactured_date', 'expiration_date', 'medicine__name',
+    ))
+
+
+def get_default_supplier_id():
+    """Id of the active supplier new POs are booked against, cached briefly.
+
+    Creates the 'Default Supplier' fallback once if none exists; the
+    Supplier save/delete signal clears the key.
+    """
+    supplier_id = cache.get('default_supplier_id')
+    if supplier_id is None:
+        supplier = Supplier.objects.filter(is_deleted=False, status='Active').only('id').first()
+        if supplier is None:
+            supplier = Supplier.objects.create(
+                name='Default Supplier',
+                contact_person='',
+                phone='',
+                email='',
+                address='',
+                status='Active'
+            )
+        supplier_id = supplier.id
+        cache.set('default_supplier_id', supplier_id, 300)
+    return supplier_id
+
+
+def _po_list_etag(request):
+    """ETag for the PO list modal: changes when a PO is added, edited or
+    removed, so unchanged polls answer 304 without re-serializing."""
+    stats = PurchaseOrder.objects.filter(is_deleted=False).aggregate(
+        latest=Max('updated_at'), total=Count('pk'),
+    )
+    return f'"po-list-{stats["latest"]}-{stats["total"]}"'
+
+
 @login_required
+@etag(_po_list_etag)
 def purchase_order_list_modal(request):
     """Display all purchase orders in modal"""
-    from base.models import PurchaseOrder
-    purchase_orders = PurchaseOrder.objects.filter(is_deleted=False).select_related('supplier', 'created_by').prefetch_related('lines__medicine').all()
-    
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.template.loader import render_to_string
+    # The modal renders id/date/status/notes plus the lines; supplier and
+    # created_by never appear, so skip the joins and narrow the projection.
+    # Bounded to the 50 most recent orders (same page size as the list view)
+    # so the rendered HTML string can't grow without limit; the full history
+    # lives on the paginated purchase-order-list page.
+    purchase_orders = PurchaseOrder.objects.filter(is_deleted=False).only(
+        'id', 'po_date', 'status', 'notes'
+    ).prefetch_related(_po_lines_prefetch())[:50]
+    
+    if is_xhr(request):
         html = render_to_string('medicine/partials/purchase_order_list_modal.html', {
             'purchase_orders': purchase_orders
         })
@@ -2865,11 +3409,20 @@ def purchase_order_list_modal(request):
 @manager_required
 def purchase_order_list(request):
     """List all purchase orders"""
-    from base.models import PurchaseOrder
-    purchase_orders = PurchaseOrder.objects.filter(is_deleted=False).select_related('supplier', 'created_by').prefetch_related('lines__medicine').order_by('-created_at')
+    # Same trim as the modal list: the page template only shows
+    # id/date/status/notes and the line rows
+    queryset = PurchaseOrder.objects.filter(is_deleted=False).only(
+        'id', 'po_date', 'status', 'notes'
+    ).prefetch_related(_po_lines_prefetch()).order_by('-created_at')
+    
+    # Page the list server-side so the view stays bounded as POs accumulate
+    paginator = Paginator(queryset, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'purchase_orders': purchase_orders,
+        'purchase_orders': page_obj.object_list,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
         'is_manager_or_admin': is_manager_or_admin(request.user),
         'user_role': get_user_role_display(request.user)
     }
@@ -2879,44 +3432,38 @@ def purchase_order_list(request):
 @manager_required
 def purchase_order_add(request):
     """Create new purchase order - regular page"""
-    from base.models import PurchaseOrder, PurchaseOrderLine, Supplier, Medicine
     
     if request.method == 'POST':
         try:
-            # Get or create default supplier
-            supplier = Supplier.objects.filter(is_deleted=False, status='Active').first()
-            if not supplier:
-                supplier = Supplier.objects.create(
-                    name='Default Supplier',
-                    contact_person='',
-                    phone='',
-                    email='',
-                    address='',
-                    status='Active'
-                )
-            
-            # Create purchase order
-            po = PurchaseOrder.objects.create(
-                supplier=supplier,
-                po_date=timezone.now().date(),
-                expected_delivery_date=timezone.now().date(),
-                status='Draft',
-                notes=request.POST.get('notes', ''),
-                created_by=request.user
-            )
+            supplier_id = get_default_supplier_id()
             
-            # Create line items
             medicine_ids = request.POST.getlist('medicine[]')
             quantities = request.POST.getlist('quantity[]')
             manufactured_dates = request.POST.getlist('manufactured_date[]')
             expiration_dates = request.POST.getlist('expiration_date[]')
             
-            for i, medicine_id in enumerate(medicine_ids):
-                if medicine_id:
-                    medicine = Medicine.objects.get(id=medicine_id)
-                    PurchaseOrderLine.objects.create(
+            # One transaction, one INSERT for all line items instead of a
+            # commit per row
+            with transaction.atomic():
+                po = PurchaseOrder.objects.create(
+                    supplier_id=supplier_id,
+                    po_date=timezone.now().date(),
+                    expected_delivery_date=timezone.now().date(),
+                    status='Draft',
+                    notes=request.POST.get('notes', ''),
+                    created_by=request.user
+                )
+                
+                # One lookup for every selected medicine, not one per row
+                selected_ids = [int(mid) for mid in medicine_ids if mid]
+                meds = Medicine.objects.filter(is_deleted=False).in_bulk(selected_ids)
+                missing = [mid for mid in selected_ids if mid not in meds]
+                if missing:
+                    raise ValueError(f"Unknown medicine id {missing[0]}.")
+                lines = [
+                    PurchaseOrderLine(
                         purchase_order=po,
-                        medicine=medicine,
+                        medicine=meds[int(medicine_id)],
                         quantity_ordered=int(quantities[i]),
                         unit='box',
                         unit_cost=0,
@@ -2924,8 +3471,14 @@ def purchase_order_add(request):
                         expiration_date=expiration_dates[i] if i < len(expiration_dates) else None,
                         remarks=''
                     )
+                    for i, medicine_id in enumerate(medicine_ids) if medicine_id
+                ]
+                PurchaseOrderLine.objects.bulk_create(lines, batch_size=1000)
+                # Inside the atomic block log_activity defers its INSERT via
+                # transaction.on_commit, so it shares the one commit and never
+                # logs a rolled-back PO
+                log_activity(request.user, f"Created purchase order #{po.id} with {len(medicine_ids)} items")
             
-            log_activity(request.user, f"Created purchase order #{po.id} with {len(medicine_ids)} items")
             messages.success(request, f"Purchase order #{po.id} created successfully!")
             return redirect('purchase-order-list')
             
@@ -2945,59 +3498,54 @@ def purchase_order_add(request):
 @login_required
 def purchase_order_add_modal(request):
     """Create new purchase order via modal"""
-    from base.models import PurchaseOrder, PurchaseOrderLine, Supplier, Medicine
     
     if request.method == 'POST':
         try:
-            # Get or create default supplier
-            supplier = Supplier.objects.filter(is_deleted=False, status='Active').first()
-            if not supplier:
-                supplier = Supplier.objects.create(
-                    name='Default Supplier',
-                    contact_person='',
-                    phone='',
-                    email='',
-                    address='',
-                    status='Active'
-                )
+            supplier_id = get_default_supplier_id()
             
-            # Create purchase order
-            po = PurchaseOrder.objects.create(
-                supplier=supplier,
-                po_date=timezone.now().date(),
-                expected_delivery_date=timezone.now().date(),
-                status='Draft',
-                notes=request.POST.get('notes', ''),
-                created_by=request.user
-            )
-            
-            # Create line items
             medicine_ids = request.POST.getlist('medicine[]')
             quantities = request.POST.getlist('quantity[]')
             
-            for i, medicine_id in enumerate(medicine_ids):
-                if medicine_id:
-                    medicine = Medicine.objects.get(id=medicine_id)
-                    PurchaseOrderLine.objects.create(
+            # One transaction, one INSERT for all line items
+            with transaction.atomic():
+                po = PurchaseOrder.objects.create(
+                    supplier_id=supplier_id,
+                    po_date=timezone.now().date(),
+                    expected_delivery_date=timezone.now().date(),
+                    status='Draft',
+                    notes=request.POST.get('notes', ''),
+                    created_by=request.user
+                )
+                
+                # One lookup for every selected medicine, not one per row
+                selected_ids = [int(mid) for mid in medicine_ids if mid]
+                meds = Medicine.objects.filter(is_deleted=False).in_bulk(selected_ids)
+                missing = [mid for mid in selected_ids if mid not in meds]
+                if missing:
+                    raise ValueError(f"Unknown medicine id {missing[0]}.")
+                lines = [
+                    PurchaseOrderLine(
                         purchase_order=po,
-                        medicine=medicine,
+                        medicine=meds[int(medicine_id)],
                         quantity_ordered=int(quantities[i]),
                         unit='box',
                         unit_cost=0,
                         remarks=''
                     )
+                    for i, medicine_id in enumerate(medicine_ids) if medicine_id
+                ]
+                PurchaseOrderLine.objects.bulk_create(lines, batch_size=1000)
+                # Deferred via transaction.on_commit (see log_activity)
+                log_activity(request.user, f"Created purchase order #{po.id} with {len(medicine_ids)} items")
             
-            log_activity(request.user, f"Created purchase order #{po.id} with {len(medicine_ids)} items")
-            
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_xhr(request):
                 return JsonResponse({'success': True})
         except Exception as e:
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_xhr(request):
                 return JsonResponse({'error': str(e)}, status=400)
     
     # GET request - show form
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.template.loader import render_to_string
+    if is_xhr(request):
         medicines = Medicine.objects.filter(is_deleted=False).order_by('name')
         html = render_to_string('medicine/partials/purchase_order_form_modal.html', {
             'medicines': medicines
@@ -3009,7 +3557,6 @@ def purchase_order_add_modal(request):
 @login_required
 def purchase_order_update_modal(request, pk):
     """Update existing purchase order via modal"""
-    from base.models import PurchaseOrder
     po = get_object_or_404(PurchaseOrder, pk=pk, is_deleted=False)
     
     if request.method == 'POST':
@@ -3018,11 +3565,10 @@ def purchase_order_update_modal(request, pk):
             po = form.save()
             log_activity(request.user, f"Updated purchase order #{po.id} - Status: {po.status}")
             
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_xhr(request):
                 return JsonResponse({'success': True})
         else:
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                from django.template.loader import render_to_string
+            if is_xhr(request):
                 html = render_to_string('medicine/partials/purchase_order_form_modal.html', {
                     'form': form,
                     'purchase_order': po
@@ -3031,8 +3577,7 @@ def purchase_order_update_modal(request, pk):
     else:
         form = PurchaseOrderForm(instance=po)
     
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.template.loader import render_to_string
+    if is_xhr(request):
         html = render_to_string('medicine/partials/purchase_order_form_modal.html', {
             'form': form,
             'purchase_order': po
@@ -3044,66 +3589,96 @@ def purchase_order_update_modal(request, pk):
 @login_required
 def purchase_order_delete(request, pk):
     """Delete purchase order"""
-    from base.models import PurchaseOrder
     po = get_object_or_404(PurchaseOrder, pk=pk)
     
     if request.method == 'POST':
         po.is_deleted = True
-        po.save()
+        po.save(update_fields=['is_deleted', 'updated_at'])
         log_activity(request.user, f"Deleted purchase order #{po.id}")
         messages.success(request, f"Purchase order #{po.id} deleted successfully.")
     
     return redirect('batch-list')
 
+def _request_payload(request):
+    """Parse a POST body once, whether it arrived as JSON or form data.
+
+    Returns a dict-like object supporting .get(); callers branch on
+    content-type only for the response format, not for parsing.
+    """
+    if request.content_type == 'application/json':
+        return json.loads(request.body)
+    return request.POST
+
 @login_required
 def purchase_order_update_status(request, pk):
     """Quick update purchase order status"""
-    from base.models import PurchaseOrder
     
     if request.method == 'POST':
         po = get_object_or_404(PurchaseOrder, pk=pk, is_deleted=False)
         
-        # Handle both form POST and JSON
-        if request.content_type == 'application/json':
-            import json
-            data = json.loads(request.body)
-            new_status = data.get('status', '')
-        else:
-            new_status = request.POST.get('status', '')
+        wants_json = request.content_type == 'application/json'
+        new_status = _request_payload(request).get('status', '')
         
         valid_statuses = ['Draft', 'Ordered', 'Received']
         if new_status in valid_statuses:
             po.status = new_status
-            po.save()
+            po.save(update_fields=['status', 'updated_at'])
             log_activity(request.user, f"Updated PO #{po.id} status to {new_status}")
             
-            if request.content_type == 'application/json':
+            if wants_json:
                 return JsonResponse({'success': True})
-            else:
-                messages.success(request, f"Order #{po.id} status updated to {new_status}")
-                return redirect('purchase-order-list')
+            messages.success(request, f"Order #{po.id} status updated to {new_status}")
+            return redirect('purchase-order-list')
         
-        if request.content_type == 'application/json':
+        if wants_json:
             return JsonResponse({'error': 'Invalid status'}, status=400)
-        else:
-            messages.error(request, 'Invalid status')
-            return redirect('purchase-order-list')
+        messages.error(request, 'Invalid status')
+        return redirect('purchase-order-list')
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 @login_required
+def purchase_order_bulk_status(request):
+    """Update the status of several purchase orders in one UPDATE"""
+    
+    if request.method != 'POST' or request.content_type != 'application/json':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    
+    data = _request_payload(request)
+    ids = data.get('ids', [])
+    new_status = data.get('status', '')
+    
+    valid_statuses = ['Draft', 'Ordered', 'Received']
+    if new_status not in valid_statuses:
+        return JsonResponse({'error': 'Invalid status'}, status=400)
+    if not isinstance(ids, list) or not ids:
+        return JsonResponse({'error': 'No purchase orders selected'}, status=400)
+    
+    # Single UPDATE for the whole selection; updated_at is set explicitly
+    # because queryset update() bypasses auto_now (the list ETag keys off it)
+    updated = PurchaseOrder.objects.filter(pk__in=ids, is_deleted=False).update(
+        status=new_status,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        log_activity(request.user, f"Updated {updated} purchase order(s) to {new_status}")
+    return JsonResponse({'success': True, 'updated': updated})
+
+@login_required
+@last_modified(lambda request, pk: PurchaseOrder.objects.filter(pk=pk).values_list('updated_at', flat=True).first())
 def purchase_order_lines(request, pk):
     """Get lines for a purchase order (for batch creation)"""
-    from base.models import PurchaseOrder
-    po = get_object_or_404(PurchaseOrder, pk=pk, is_deleted=False, status='Received')
-    
-    lines_data = []
-    for line in po.lines.all():
-        lines_data.append({
-            'id': line.id,
-            'medicine_name': line.medicine.name,
-            'quantity': line.quantity_ordered
-        })
+    po = get_object_or_404(PurchaseOrder.objects.only('id'), pk=pk, is_deleted=False, status='Received')
+    
+    # One JOINed values() query instead of a medicine lookup per line
+    lines_data = [
+        {
+            'id': line['id'],
+            'medicine_name': line['medicine__name'],
+            'quantity': line['quantity_ordered'],
+        }
+        for line in po.lines.values('id', 'medicine__name', 'quantity_ordered')
+    ]
     
     return JsonResponse({'lines': lines_data})
 
@@ -3116,24 +3691,39 @@ class NotificationListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user)
+        # Template renders type/title/message/read state/date only; the
+        # related medicine/batch FKs are never followed, so skip their
+        # columns rather than join them
+        return Notification.objects.filter(user=self.request.user).only(
+            'notification_type', 'title', 'message', 'is_read', 'created_at',
+        )
+    
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, **kwargs)
+        # One aggregate supplies both the paginator total and the unread
+        # badge instead of separate COUNT queries
+        counts = queryset.aggregate(
+            total=Count('pk'),
+            unread=Count('pk', filter=Q(is_read=False)),
+        )
+        paginator.count = counts['total']
+        self._unread_count = counts['unread']
+        return paginator
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['is_manager_or_admin'] = is_manager_or_admin(self.request.user)
         context['user_role'] = get_user_role_display(self.request.user)
-        context['unread_count'] = Notification.objects.filter(
-            user=self.request.user,
-            is_read=False
-        ).count()
+        context['unread_count'] = self._unread_count
         return context
 
 @login_required
 def mark_notification_read(request, pk):
     """Mark a notification as read"""
-    notification = get_object_or_404(Notification, pk=pk, user=request.user)
-    notification.is_read = True
-    notification.save()
+    # One UPDATE scoped to the owner; no SELECT-then-full-row-save
+    updated = Notification.objects.filter(pk=pk, user=request.user).update(is_read=True)
+    if not updated:
+        raise Http404("No Notification matches the given query.")
     
     # Redirect to related page if available
     next_url = request.GET.get('next', 'notification-list')
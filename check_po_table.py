@@ -1,22 +1,16 @@
-import MySQLdb
+from db_utils import mysql_conn
 
 try:
-    conn = MySQLdb.connect(
-        host='localhost',
-        user='root',
-        password='ImongMAMA123',
-        database='inventorytgp_new'
-    )
-    cursor = conn.cursor()
-    
-    # Check if table exists and get structure
-    cursor.execute("SHOW CREATE TABLE base_purchaseorder")
-    result = cursor.fetchone()
-    if result:
-        print("=== Current PurchaseOrder Table Structure ===")
-        print(result[1])
-    
-    conn.close()
+    with mysql_conn() as conn:
+        cursor = conn.cursor()
+
+        # Check if table exists and get structure
+        cursor.execute("SHOW CREATE TABLE base_purchaseorder")
+        result = cursor.fetchone()
+        if result:
+            print("=== Current PurchaseOrder Table Structure ===")
+            print(result[1])
+
     print("\n=== Success ===")
 except Exception as e:
     print(f"Error: {e}")
@@ -1,26 +1,27 @@
-import MySQLdb
+from db_utils import mysql_conn
 
 try:
-    conn = MySQLdb.connect(
-        host='localhost',
-        user='root',
-        password='ImongMAMA123',
-        database='inventorytgp_new'
-    )
-    cursor = conn.cursor()
-    
-    # Check tables
-    cursor.execute("SHOW TABLES LIKE 'base_%'")
-    tables = cursor.fetchall()
-    
-    print("=== Related Tables ===")
-    for table in tables:
-        if 'purchase' in table[0].lower() or 'supplier' in table[0].lower():
-            print(f"\n{table[0]}:")
-            cursor.execute(f"DESC {table[0]}")
-            for row in cursor.fetchall():
-                print(f"  {row[0]} - {row[1]}")
-    
-    conn.close()
+    with mysql_conn() as conn:
+        cursor = conn.cursor()
+
+        # One information_schema query instead of SHOW TABLES plus a DESC
+        # round-trip per matching table
+        cursor.execute(
+            """
+            SELECT table_name, column_name, column_type
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+              AND (table_name LIKE 'base_%purchase%' OR table_name LIKE 'base_%supplier%')
+            ORDER BY table_name, ordinal_position
+            """
+        )
+
+        print("=== Related Tables ===")
+        current_table = None
+        for table_name, column_name, column_type in cursor.fetchall():
+            if table_name != current_table:
+                current_table = table_name
+                print(f"\n{table_name}:")
+            print(f"  {column_name} - {column_type}")
 except Exception as e:
     print(f"Error: {e}")
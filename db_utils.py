@@ -0,0 +1,25 @@
+"""Shared MySQL connection helper for the ad-hoc check_*.py scripts.
+
+Each script used to open (and pay the TCP + auth handshake for) its own
+MySQLdb connection with hardcoded credentials. They now share this context
+manager; credentials come from the environment, defaulting to the local dev
+setup the scripts always targeted.
+"""
+import os
+from contextlib import contextmanager
+
+import MySQLdb
+
+
+@contextmanager
+def mysql_conn():
+    conn = MySQLdb.connect(
+        host=os.environ.get('DB_HOST', 'localhost'),
+        user=os.environ.get('DB_USER', 'root'),
+        password=os.environ.get('DB_PASSWORD', 'ImongMAMA123'),
+        database=os.environ.get('DB_NAME', 'inventorytgp_new'),
+    )
+    try:
+        yield conn
+    finally:
+        conn.close()
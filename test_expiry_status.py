@@ -8,20 +8,33 @@ This script demonstrates the expiry status color indicators:
 
 from datetime import date, timedelta
 
+EXPIRY_STATUSES = (
+    ("Expired", "Red"),
+    ("Near Expiry", "Yellow/Orange"),
+    ("Good", "Green"),
+)
+
+
+def classify_expiry(expiry_dates):
+    """
+    Classify many expiry dates in one pass.
+    Computes today/threshold once instead of per date and returns a list
+    of (status_name, color_indicator) tuples in input order.
+    """
+    today = date.today()
+    six_months_from_now = today + timedelta(days=180)
+    return [
+        EXPIRY_STATUSES[0 if d < today else (1 if d <= six_months_from_now else 2)]
+        for d in expiry_dates
+    ]
+
+
 def get_expiry_status(expiry_date):
     """
     Determine expiry status based on expiry date
     Returns: tuple (status_name, color_indicator)
     """
-    today = date.today()
-    six_months_from_now = today + timedelta(days=180)
-    
-    if expiry_date < today:
-        return ("Expired", "Red")
-    elif expiry_date <= six_months_from_now:
-        return ("Near Expiry", "Yellow/Orange")
-    else:
-        return ("Good", "Green")
+    return classify_expiry([expiry_date])[0]
 
 # Test cases
 print("Expiry Status Test Cases")
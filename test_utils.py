@@ -0,0 +1,23 @@
+"""Shared lookup helpers for the root test/verify scripts.
+
+The harness scripts each re-query DiscountType and PaymentMethod on
+startup; memoizing the lookups lets repeated runs in one process (e.g.
+via `manage.py verify --target=all`) hit the cache instead of re-issuing
+the same icontains SELECT.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8)
+def get_discount(name_substr):
+    from base.models import DiscountType
+    return DiscountType.objects.filter(discount_name__icontains=name_substr).first()
+
+
+@lru_cache(maxsize=8)
+def get_payment_method(method_name):
+    from base.models import PaymentMethod
+    return (
+        PaymentMethod.objects.filter(method_name=method_name).first()
+        or PaymentMethod.objects.first()
+    )
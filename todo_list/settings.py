@@ -95,6 +95,10 @@ DATABASES = {
         'HOST': 'localhost',
         # 'HOST': '127.0.0.1',
         'PORT': '3306',
+        # Keep connections open between requests so the small AJAX modal
+        # endpoints don't pay a fresh MySQL handshake on every hit.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
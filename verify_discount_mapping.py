@@ -1,10 +1,62 @@
-import os, django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE','todo_list.settings')
-django.setup()
-from base.models import Sale
-
-missing = Sale.objects.filter(discount_type_fk__isnull=True).count()
-print(f"Sales still without FK discount_type: {missing}")
-example = Sale.objects.filter(discount_type_fk__isnull=False).order_by('-sale_id').first()
-if example:
-    print(f"Sample Sale #{example.sale_id}: legacy={example.discount_type} mapped_to={example.discount_type_fk.discount_name} rate={example.discount_type_fk.discount_rate}")
+"""Check that legacy sales have been mapped to DiscountType FKs.
+
+By default this talks to MySQL directly through db_utils.mysql_conn — the
+two read queries don't need the ORM, and skipping django.setup() takes the
+script from ~1 s to milliseconds. Pass --orm to run the Django version
+(also what `manage.py verify --target=discount` uses).
+"""
+import sys
+
+
+def main():
+    """ORM version; assumes django.setup() has already run."""
+    from base.models import Sale
+
+    missing = Sale.objects.filter(discount_type_fk__isnull=True).count()
+    print(f"Sales still without FK discount_type: {missing}")
+    # Join the discount type and fetch only the columns printed below; the
+    # legacy discount_type column was dropped in migration 0009
+    example = (
+        Sale.objects.filter(discount_type_fk__isnull=False)
+        .select_related('discount_type_fk')
+        .only('sale_id', 'discount_type_fk__discount_name', 'discount_type_fk__discount_rate')
+        .order_by('-sale_id')
+        .first()
+    )
+    if example:
+        print(f"Sample Sale #{example.sale_id}: mapped_to={example.discount_type_fk.discount_name} rate={example.discount_type_fk.discount_rate}")
+
+
+def main_raw():
+    """Raw-SQL version: same two queries, no Django bootstrap."""
+    from db_utils import mysql_conn
+
+    with mysql_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM base_sale WHERE discount_type_fk_id IS NULL")
+        (missing,) = cursor.fetchone()
+        print(f"Sales still without FK discount_type: {missing}")
+
+        cursor.execute(
+            """
+            SELECT s.sale_id, d.discount_name, d.discount_rate
+            FROM base_sale s
+            JOIN base_discounttype d ON d.discount_type_id = s.discount_type_fk_id
+            ORDER BY s.sale_id DESC
+            LIMIT 1
+            """
+        )
+        row = cursor.fetchone()
+        if row:
+            print(f"Sample Sale #{row[0]}: mapped_to={row[1]} rate={row[2]}")
+
+
+if __name__ == '__main__':
+    if '--orm' in sys.argv:
+        import os
+        import django
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_list.settings')
+        django.setup()
+        main()
+    else:
+        main_raw()
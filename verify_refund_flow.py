@@ -2,53 +2,71 @@ import os, django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE','todo_list.settings')
 django.setup()
 from django.contrib.auth.models import User
-from base.models import Sale, Refund, StockMovement
+from django.db import transaction
+from django.db.models import F
+from base.models import Sale, Refund, StockMovement, StockBatch
 from decimal import Decimal
 
-user = User.objects.filter(is_superuser=True).first()
-latest_sale = Sale.objects.order_by('-sale_id').first()
-if not latest_sale:
-    print('No sale found to refund.')
-    raise SystemExit
-
-# Ensure sale has movements
-movements = latest_sale.movements.all()
-print(f'Sale #{latest_sale.sale_id} movements count: {movements.count()}')
-
-# Process full refund via model logic similar to view
-from base.models import PaymentMethod
-pm = latest_sale.payment_method or PaymentMethod.objects.first()
-
-amount = latest_sale.final_amount
-if amount <= 0:
-    print('Sale has zero amount; cannot refund.')
-    raise SystemExit
-
-restored_total = 0
-for m in movements.select_related('batch','medicine'):
-    if m.batch and m.quantity > 0:
-        m.batch.quantity += m.quantity
-        m.batch.save()
-        restored_total += m.quantity
-        StockMovement.objects.create(
-            medicine=m.medicine,
-            batch=m.batch,
-            from_location='',
-            to_location=m.batch.location,
-            quantity=m.quantity,
-            reason='returned',
-            remarks=f'Refund reversal of Sale #{latest_sale.sale_id}',
-            user=user
+
+def main():
+    user = User.objects.filter(is_superuser=True).first()
+    latest_sale = Sale.objects.order_by('-sale_id').first()
+    if not latest_sale:
+        print('No sale found to refund.')
+        return
+
+    # Ensure sale has movements
+    movements = latest_sale.movements.all()
+    print(f'Sale #{latest_sale.sale_id} movements count: {movements.count()}')
+
+    # Process full refund via model logic similar to view
+    from base.models import PaymentMethod
+    pm = latest_sale.payment_method or PaymentMethod.objects.first()
+
+    amount = latest_sale.final_amount
+    if amount <= 0:
+        print('Sale has zero amount; cannot refund.')
+        return
+
+    # Accumulate the restores, then write them in bulk: one F-expression
+    # UPDATE per batch and one multi-row INSERT for the reversal movements,
+    # instead of a save() + create() pair per movement. The iterator keeps
+    # memory flat for wholesale-sized refunds.
+    restored_total = 0
+    batch_restores = {}
+    reversal_moves = []
+    for m in movements.select_related('batch', 'medicine').iterator(chunk_size=500):
+        if m.batch and m.quantity > 0:
+            batch_restores[m.batch_id] = batch_restores.get(m.batch_id, 0) + m.quantity
+            restored_total += m.quantity
+            reversal_moves.append(StockMovement(
+                medicine=m.medicine,
+                batch=m.batch,
+                from_location='',
+                to_location=m.batch.location,
+                quantity=m.quantity,
+                reason='returned',
+                remarks=f'Refund reversal of Sale #{latest_sale.sale_id}',
+                user=user
+            ))
+
+    with transaction.atomic():
+        for bid, qty in batch_restores.items():
+            StockBatch.objects.filter(pk=bid).update(quantity=F('quantity') + qty)
+        StockMovement.objects.bulk_create(reversal_moves, batch_size=500)
+
+        refund = Refund.objects.create(
+            sale=latest_sale,
+            amount_refunded=amount,
+            reason='customer_request',
+            reason_details='Automated test full refund',
+            processed_by=user,
+            payment_method=pm,
         )
 
-refund = Refund.objects.create(
-    sale=latest_sale,
-    amount_refunded=amount,
-    reason='customer_request',
-    reason_details='Automated test full refund',
-    processed_by=user,
-    payment_method=pm,
-)
-
-print(f'Refund #{refund.refund_id} created for Sale #{latest_sale.sale_id} amount ₱{amount}')
-print(f'Restored pieces: {restored_total}')
+    print(f'Refund #{refund.refund_id} created for Sale #{latest_sale.sale_id} amount ₱{amount}')
+    print(f'Restored pieces: {restored_total}')
+
+
+if __name__ == '__main__':
+    main()